@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for jsonobject; see `python -m benchmarks --help`
+
+"""
@@ -0,0 +1,235 @@
+"""
+Run the benchmarks in benchmarks/suites.py
+
+From the root of the repository, after building the extension modules
+with `python setup.py build_ext --inplace`:
+
+    python -m benchmarks                     # time the compiled modules
+    python -m benchmarks --pure              # time the .pyx sources run as Python
+    python -m benchmarks --compare           # time both, side by side
+    python -m benchmarks -k Wrap -o a.json   # only matching benchmarks, saved
+    python -m benchmarks --baseline a.json   # compare with a saved run
+
+Each benchmark is timed over --repeat samples, reporting the median and
+the fastest, and run once more under tracemalloc to record the peak
+memory allocated during a call.
+
+"""
+import argparse
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'jsonobject')
+# calls are repeated until a sample takes at least this long
+MIN_SAMPLE_TIME = 0.1
+
+
+class PyxSourceFinder(importlib.abc.MetaPathFinder):
+    """
+    import jsonobject's modules from their .pyx sources as plain Python
+
+    The sources are written in pure Python syntax,
+    so they run unchanged without being compiled by Cython.
+
+    """
+    def find_spec(self, fullname, path, target=None):
+        package, _, name = fullname.rpartition('.')
+        filename = os.path.join(PACKAGE_DIR, name + '.pyx')
+        if package != 'jsonobject' or not os.path.exists(filename):
+            return None
+        loader = importlib.machinery.SourceFileLoader(fullname, filename)
+        return importlib.util.spec_from_file_location(fullname, filename, loader=loader)
+
+
+def iter_benchmarks(suites, pattern):
+    for suite in suites:
+        for method_name, _ in inspect.getmembers(suite, inspect.isfunction):
+            if not method_name.startswith('time_'):
+                continue
+            for param in suite.params:
+                name = '{}.{}({})'.format(suite.__name__, method_name, param)
+                if pattern is None or pattern in name:
+                    yield name, suite, method_name, param
+
+
+def _calibrate(suite, method_name, param):
+    number = getattr(suite, 'number', None)
+    if number:
+        return number
+    instance = suite()
+    instance.setup(param)
+    method = getattr(instance, method_name)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            method(param)
+        if time.perf_counter() - start >= MIN_SAMPLE_TIME or number >= 10 ** 6:
+            return number
+        number *= 10
+
+
+def run_benchmark(suite, method_name, param, repeat):
+    number = _calibrate(suite, method_name, param)
+    samples = []
+    for _ in range(repeat):
+        instance = suite()
+        instance.setup(param)
+        method = getattr(instance, method_name)
+        start = time.perf_counter()
+        for _ in range(number):
+            method(param)
+        samples.append((time.perf_counter() - start) / number)
+
+    instance = suite()
+    instance.setup(param)
+    method = getattr(instance, method_name)
+    tracemalloc.start()
+    try:
+        method(param)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'number': number,
+        'repeat': repeat,
+        'peak_memory': peak_memory,
+    }
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '{:.3g} {}'.format(seconds / scale, unit)
+    return '{:.3g} ns'.format(seconds / 1e-9)
+
+
+def format_memory(size):
+    return '{:,} KiB'.format(round(size / 1024))
+
+
+def format_ratio(new, old):
+    return '{:.2f}x'.format(new / old) if old else '-'
+
+
+def print_table(header, rows):
+    widths = [max(len(str(row[i])) for row in [header] + rows)
+              for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(str(cell).rjust(width) if i else str(cell).ljust(width)
+                        for i, (cell, width) in enumerate(zip(row, widths))))
+
+
+def run(args):
+    if args.pure:
+        sys.dont_write_bytecode = True
+        sys.meta_path.insert(0, PyxSourceFinder())
+    try:
+        import jsonobject.base
+    except ImportError as e:
+        sys.exit('{}\nBuild the extension modules first with '
+                 '`python setup.py build_ext --inplace`'.format(e))
+    from benchmarks.suites import SUITES
+
+    implementation = ('pure' if jsonobject.base.__file__.endswith('.pyx')
+                      else 'compiled')
+    results = {}
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    for name, suite, method_name, param in iter_benchmarks(SUITES, args.k):
+        result = run_benchmark(suite, method_name, param, args.repeat)
+        results[name] = result
+        if not args.quiet:
+            line = '{}: {} (min {}), peak {}'.format(
+                name, format_time(result['median']), format_time(result['min']),
+                format_memory(result['peak_memory']))
+            if name in baseline:
+                line += ', {} of baseline'.format(
+                    format_ratio(result['median'], baseline[name]['median']))
+            print(line, flush=True)
+    output = {
+        'implementation': implementation,
+        'python': platform.python_version(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+    return output
+
+
+def compare(args):
+    outputs = {}
+    for implementation in ('compiled', 'pure'):
+        print('Running the {} modules...'.format(implementation), flush=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'results.json')
+            command = [sys.executable, '-m', 'benchmarks', '--quiet',
+                       '--repeat', str(args.repeat), '-o', filename]
+            if args.k:
+                command += ['-k', args.k]
+            if implementation == 'pure':
+                command.append('--pure')
+            subprocess.run(command, check=True)
+            with open(filename) as f:
+                outputs[implementation] = f.read()
+    compiled, pure = (json.loads(outputs[implementation])['results']
+                      for implementation in ('compiled', 'pure'))
+    rows = [
+        (name, format_time(compiled[name]['median']), format_time(pure[name]['median']),
+         format_ratio(pure[name]['median'], compiled[name]['median']),
+         format_memory(compiled[name]['peak_memory']),
+         format_memory(pure[name]['peak_memory']))
+        for name in compiled
+    ]
+    print_table(('benchmark', 'compiled', 'pure', 'pure/compiled',
+                 'compiled peak', 'pure peak'), rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({name: json.loads(output)
+                       for name, output in outputs.items()},
+                      f, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', metavar='PATTERN',
+                        help='only run the benchmarks whose names contain PATTERN')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='the number of samples to time (default: %(default)s)')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='save the results as JSON to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare with the results saved in FILE')
+    parser.add_argument('--quiet', action='store_true', help=argparse.SUPPRESS)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--pure', action='store_true',
+                       help='run the .pyx sources as Python rather than the compiled modules')
+    group.add_argument('--compare', action='store_true',
+                       help='run both the compiled modules and the .pyx sources')
+    args = parser.parse_args()
+    if args.compare:
+        compare(args)
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+"""
+Benchmarks of the common operations on jsonobject objects
+
+Each suite is a class following asv's conventions: its setup(param) is
+run before timing each of its time_*(param) methods, for each of the
+suite's params.  Suites that change the objects they set up have
+number = 1, so that setup() is run again before every call timed.
+
+The app documents in test/couchdbkit/data, wrapped with the Application
+schema defined alongside them, serve as realistic fixtures.
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import datetime
+import json
+import os
+import pickle
+
+from jsonobject import (
+    DateProperty,
+    DictProperty,
+    IntegerProperty,
+    JsonObject,
+    ListProperty,
+    SetProperty,
+    StringProperty,
+)
+from test.couchdbkit.application import Application
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'test', 'couchdbkit', 'data',
+)
+FIXTURES = ('basic', 'medium', 'large', 'multimedia_map')
+
+_documents = {}
+
+
+def load(name):
+    """
+    a fresh copy of the fixture document called name
+
+    wrap() makes the document it is given part of the object it returns,
+    so each wrap is given its own copy.
+
+    """
+    if name not in _documents:
+        with open(os.path.join(DATA_DIR, name + '.json')) as f:
+            _documents[name] = f.read()
+    return json.loads(_documents[name])
+
+
+class Item(JsonObject):
+    name = StringProperty()
+    count = IntegerProperty()
+
+
+class Container(JsonObject):
+    dates = ListProperty(datetime.date)
+    items = ListProperty(Item)
+    strings = ListProperty(str)
+    counts = DictProperty(int)
+    ids = SetProperty(str)
+
+
+def container_document(size):
+    start = datetime.date(2000, 1, 1)
+    return {
+        'dates': [(start + datetime.timedelta(days=(i * 7919) % 5000)).isoformat()
+                  for i in range(size)],
+        'items': [{'name': 'item%d' % i, 'count': i} for i in range(size)],
+        'strings': ['string%d' % ((i * 7919) % size) for i in range(size)],
+        'counts': {'key%d' % i: i for i in range(size)},
+        'ids': ['id%d' % i for i in range(size)],
+    }
+
+
+class Wrap:
+    params = FIXTURES
+
+    def setup(self, name):
+        load(name)
+
+    def time_wrap(self, name):
+        Application.wrap(load(name))
+
+    def time_wrap_lazy(self, name):
+        Application.wrap(load(name), lazy=True)
+
+    def time_wrap_trusted(self, name):
+        Application.wrap(load(name), trusted=True)
+
+    def time_wrap_json(self, name):
+        Application.wrap_json(_documents[name])
+
+    def time_wrap_frozen(self, name):
+        Application.wrap(load(name), trusted=True, frozen=True)
+
+
+class Access:
+    params = FIXTURES
+
+    def setup(self, name):
+        self.app = Application.wrap(load(name))
+
+    def time_attributes(self, name):
+        app = self.app
+        for module in app.modules:
+            module.name, module.case_type, module.unique_id
+            for form in module.forms:
+                form.name, form.unique_id, form.xmlns, form.requires
+                form.actions.open_case.condition.type
+            for detail in module.details:
+                for column in detail.columns:
+                    column.header, column.field, column.late_flag
+        for item in app.multimedia_map.values():
+            item.multimedia_id, item.media_type, item.version
+        app.langs, app.build_spec, app.profile, app.translations
+
+
+class Serialize:
+    params = FIXTURES
+
+    def setup(self, name):
+        self.app = Application.wrap(load(name))
+
+    def time_to_json(self, name):
+        self.app.to_json()
+
+    def time_to_json_no_copy(self, name):
+        self.app.to_json(copy=False)
+
+    def time_to_json_string(self, name):
+        self.app.to_json_string()
+
+    def time_validate_trusted(self, name):
+        # a trusted wrap defers all validation to validate()
+        Application.wrap(load(name), trusted=True).validate()
+
+    def time_revalidate_after_change(self, name):
+        self.app.name = self.app.name
+        self.app.validate()
+
+
+class Copy:
+    params = FIXTURES
+
+    def setup(self, name):
+        self.app = Application.wrap(load(name))
+
+    def time_deepcopy(self, name):
+        copy.deepcopy(self.app)
+
+    def time_copy(self, name):
+        copy.copy(self.app)
+
+    def time_pickle_round_trip(self, name):
+        pickle.loads(pickle.dumps(self.app, pickle.HIGHEST_PROTOCOL))
+
+
+class ArrayMutation:
+    params = (10000,)
+    number = 1
+
+    def setup(self, size):
+        self.obj = Container.wrap(container_document(size))
+        self.new_dates = [datetime.date(2001, 1, 1)] * 1000
+        self.new_items = [Item(name='new', count=0) for _ in range(1000)]
+
+    def time_append_dates(self, size):
+        append = self.obj.dates.append
+        for date in self.new_dates:
+            append(date)
+
+    def time_extend_items(self, size):
+        self.obj.items.extend(self.new_items)
+
+    def time_sort_dates(self, size):
+        self.obj.dates.sort()
+
+    def time_sort_strings(self, size):
+        self.obj.strings.sort()
+
+    def time_sort_items(self, size):
+        self.obj.items.sort(key=lambda item: -item.count)
+
+    def time_set_slice(self, size):
+        self.obj.dates[:1000] = self.new_dates
+
+    def time_delete_slice(self, size):
+        del self.obj.items[:size // 2]
+
+    def time_remove_strings(self, size):
+        strings = self.obj.strings
+        for value in strings[-100:]:
+            strings.remove(value)
+
+    def time_pop_items(self, size):
+        items = self.obj.items
+        for _ in range(1000):
+            items.pop(0)
+
+
+class DictMutation:
+    params = (10000,)
+    number = 1
+
+    def setup(self, size):
+        self.obj = Container.wrap(container_document(size))
+        self.keys = ['new%d' % i for i in range(1000)]
+
+    def time_setitem(self, size):
+        counts = self.obj.counts
+        for i, key in enumerate(self.keys):
+            counts[key] = i
+
+    def time_update(self, size):
+        self.obj.counts.update(dict.fromkeys(self.keys, 1))
+
+    def time_delitem(self, size):
+        counts = self.obj.counts
+        for i in range(1000):
+            del counts['key%d' % i]
+
+
+class SetMutation:
+    params = (10000,)
+    number = 1
+
+    def setup(self, size):
+        self.obj = Container.wrap(container_document(size))
+        self.half = {'id%d' % i for i in range(0, size, 2)}
+
+    def time_add(self, size):
+        add = self.obj.ids.add
+        for i in range(1000):
+            add('new%d' % i)
+
+    def time_remove(self, size):
+        remove = self.obj.ids.remove
+        for i in range(1000):
+            remove('id%d' % i)
+
+    def time_intersection_update(self, size):
+        self.obj.ids &= self.half
+
+    def time_clear(self, size):
+        self.obj.ids.clear()
+
+
+class ContainerWrap:
+    params = (10000,)
+
+    def setup(self, size):
+        self.doc = json.dumps(container_document(size))
+
+    def time_wrap_containers(self, size):
+        Container.wrap(json.loads(self.doc))
+
+
+class Wide(JsonObject):
+    locals().update(('string%d' % i, StringProperty()) for i in range(40))
+    locals().update(('int%d' % i, IntegerProperty()) for i in range(40))
+    locals().update(('date%d' % i, DateProperty()) for i in range(20))
+    strings = ListProperty(str)
+
+
+class WideSchema:
+    params = (1000,)
+
+    def setup(self, size):
+        doc = {'string%d' % i: 'value' for i in range(40)}
+        doc.update(('int%d' % i, i) for i in range(40))
+        doc.update(('date%d' % i, '2000-01-01') for i in range(20))
+        doc['strings'] = ['string%d' % i for i in range(size)]
+        self.doc = json.dumps(doc)
+        self.obj = Wide.wrap(json.loads(self.doc))
+
+    def time_revalidate(self, size):
+        self.obj.string0 = self.obj.string0
+        self.obj.strings.append('new')
+        self.obj.strings.pop()
+        self.obj.validate()
+
+    def time_wrap_trusted_to_json(self, size):
+        Wide.wrap(json.loads(self.doc), trusted=True).to_json(copy=False)
+
+
+class Threads:
+    """
+    wrapping and serializing distinct objects on a pool of threads
+
+    Compare the params: more threads only finish sooner
+    on free-threaded builds of Python.
+
+    """
+    params = (1, 4)
+    documents = 16
+
+    def setup(self, workers):
+        load('medium')
+        self.docs = [_documents['medium']] * self.documents
+        self.apps = [Application.wrap_json(doc) for doc in self.docs]
+
+    def time_wrap(self, workers):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(Application.wrap_json, self.docs))
+
+    def time_to_json(self, workers):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(Application.to_json, self.apps))
+
+
+class Nested:
+    params = (500,)
+
+    class Node(JsonObject):
+        value = IntegerProperty()
+        children = ListProperty(lambda: Nested.Node)
+        tags = DictProperty()
+
+    def setup(self, size):
+        self.doc = json.dumps({
+            'value': 0,
+            'children': [{'value': i, 'children': [{'value': j, 'tags': {'a': 'b'}}
+                                                  for j in range(5)]}
+                         for i in range(size)],
+        })
+        self.node = self.Node.wrap(json.loads(self.doc))
+
+    def time_wrap(self, size):
+        self.Node.wrap(json.loads(self.doc))
+
+    def time_to_json(self, size):
+        self.node.to_json()
+
+    def time_deepcopy(self, size):
+        copy.deepcopy(self.node)
+
+
+SUITES = [Wrap, Access, Serialize, Copy, ArrayMutation, DictMutation,
+          SetMutation, ContainerWrap, WideSchema, Threads, Nested]
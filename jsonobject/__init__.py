@@ -2,6 +2,8 @@ from .base import JsonObjectMeta
 from .containers import JsonArray
 from .properties import *
 from .api import JsonObject
+from .utils import MISSING
+from .profiling import profile
 
 __version__ = '2.3.1'
 __all__ = [
@@ -5,6 +5,7 @@ import re
 from jsonobject.base import JsonObjectBase, _LimitedDictInterfaceMixin
 from . import properties
 from .containers import JsonArray, JsonDict, JsonSet
+from .utils import wrapping_owned
 
 
 re_date = re.compile(r'^(\d{4})\D?(0[1-9]|1[0-2])\D?([12]\d|0[1-9]|3[01])$')
@@ -18,7 +19,46 @@ re_datetime = re.compile(
 re_decimal = re.compile(r'^(\d+)\.(\d+)$')
 
 
+def _unpickle(cls, obj, frozen=False, freeze=False):
+    """
+    rebuild a pickled JsonObject from its JSON
+
+    The JSON was valid when it was pickled, so it is wrapped trusted.
+    It is wrapped eagerly (unless the class wraps lazily), so that, as
+    before, reading a restored object doesn't change it, e.g. when it
+    is shared between threads by a cache.
+    frozen is for objects wrapped frozen and freeze for objects frozen
+    later, which are compared and hashed differently (see freeze).
+    Like __setstate__, this bypasses any override of wrap().
+    The unpickled JSON belongs to the object (see wrapping_owned).
+
+    """
+    token = wrapping_owned.set(True)
+    try:
+        self = JsonObjectBase.wrap.__func__(
+            cls, obj, trusted=True, frozen=frozen)
+    finally:
+        wrapping_owned.reset(token)
+    if freeze:
+        self.freeze()
+    return self
+
+
 class JsonObject(JsonObjectBase, _LimitedDictInterfaceMixin):
+    def __reduce_ex__(self, protocol):
+        cls = type(self)
+        if (cls.__getstate__ is not JsonObject.__getstate__
+                or cls.__setstate__ is not JsonObject.__setstate__
+                or cls.__reduce__ is not JsonObject.__reduce__
+                or cls.__reduce_ex__ is not JsonObject.__reduce_ex__):
+            # respect a subclass's own pickling
+            return super(JsonObject, self).__reduce_ex__(protocol)
+        if self._hashed_by_value:
+            return _unpickle, (cls, self.to_json(), True)
+        if self._frozen:
+            return _unpickle, (cls, self.to_json(), False, True)
+        return _unpickle, (cls, self.to_json())
+
     def __getstate__(self):
         return self.to_json()
 
@@ -1,13 +1,37 @@
 from collections import namedtuple, OrderedDict
-import copy
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 import inspect
+import json
+import re
 from jsonobject.exceptions import (
     DeleteNotAllowed,
     WrappingAttributeError,
 )
-from jsonobject.base_properties import JsonProperty, DefaultProperty
-from jsonobject.utils import check_type
+from jsonobject.base_properties import (
+    DefaultProperty,
+    JsonContainerProperty,
+    JsonProperty,
+)
+from jsonobject.utils import (
+    ChangeTrackingMixin,
+    MISSING,
+    check_type,
+    copy_item,
+    copy_json,
+    iter_json_array,
+    iter_json_lines,
+    wrapping_owned,
+    wrapping_trusted,
+    _DEFERRED,
+)
+
 
+# instance attributes that __clone sets up afresh rather than copying
+_CLONED_STATE = frozenset([
+    '_obj', '_wrapped', '_valid', '_parents', '_tracking', '_has_changes',
+    '_original', '_frozen', '_hashed_by_value', '_json_strings',
+])
 
 JsonObjectClassSettings = namedtuple('JsonObjectClassSettings', ['type_config'])
 
@@ -67,7 +91,16 @@ class TypeConfig(object):
         )
         # cache this
         self.string_conversions = self._get_string_conversions()
+        self.convert_string = compile_string_conversions(
+            self.string_conversions)
         self.properties = self._properties
+        # property instances shared by all values of a type,
+        # filled in by DefaultProperty.value_to_property
+        self.property_cache = {}
+        self.default_property = DefaultProperty(type_config=self)
+
+    def __reduce__(self):
+        return type(self), (self._properties, self._string_conversions)
 
     def replace(self, properties=None, string_conversions=None):
         return TypeConfig(
@@ -106,7 +139,267 @@ class TypeConfig(object):
             result.append((pattern, conversion))
         return result
 
+
+def compile_string_conversions(string_conversions):
+    """
+    compile a list of (regex, conversion) pairs into a function that
+    converts a string with the conversion of the first regex matching it,
+    returning the string unchanged if none match or the conversion fails
+
+    Rather than trying each regex in turn, the strings that can't match
+    any of them (most strings) are rejected by looking at their first
+    character where the regexes make that possible, and the rest are
+    matched against a single regex combining them all.
+
+    """
+    conversions_by_group = {}
+    alternatives = []
+    for i, (pattern, conversion) in enumerate(string_conversions):
+        group = '_conversion_{}'.format(i)
+        conversions_by_group[group] = conversion
+        alternatives.append((group, _inline_pattern(pattern)))
+    combined = None
+    if alternatives and all(source is not None for _, source in alternatives):
+        try:
+            combined = re.compile('|'.join(
+                '(?P<{}>{})'.format(group, source)
+                for group, source in alternatives))
+        except re.error:
+            pass
+    first_chars = _get_first_chars(
+        pattern for pattern, _ in string_conversions)
+
+    def convert_string(value):
+        if first_chars is not None:
+            chars, decimal = first_chars
+            if not value or not (value[0] in chars
+                                 or decimal and value[0].isdecimal()):
+                return value
+        if combined is not None:
+            match = combined.match(value)
+            if match is None:
+                return value
+            conversion = conversions_by_group[match.lastgroup]
+        else:
+            for pattern, conversion in string_conversions:
+                if pattern.match(value):
+                    break
+            else:
+                return value
+        if conversion is None:
+            return value
+        try:
+            #sometimes regex fail so return value
+            return conversion(value)
+        except Exception:
+            return value
+
+    return convert_string
+
+
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'),
+                 (re.DOTALL, 's'), (re.VERBOSE, 'x'), (re.ASCII, 'a'))
+_SPECIAL_CHARS = frozenset('.^$*+?{}[]()|\\')
+
+
+def _inline_pattern(pattern):
+    """
+    return pattern's source with its flags inlined, so that it can be
+    combined with other patterns, or None if it can't be
+
+    """
+    source = getattr(pattern, 'pattern', None)
+    if not isinstance(source, str) or '(?P=' in source \
+            or re.search(r'\\[1-9]|\(\?\(\d', source):
+        # not a compiled regex, or uses backreferences or conditionals
+        # such as (?(1)...), which refer to groups by number and would be
+        # thrown off by the added group
+        return None
+    flags = ''.join(letter for flag, letter in _INLINE_FLAGS
+                    if pattern.flags & flag)
+    if flags:
+        return '(?{}:{})'.format(flags, source)
+    return '(?:{})'.format(source)
+
+
+def _get_first_chars(patterns):
+    """
+    return (chars, decimal) such that each string matching any of patterns
+    starts with one of chars or (if decimal) a decimal digit,
+    or None if that isn't obvious from the patterns
+
+    """
+    chars = set()
+    for pattern in patterns:
+        source = getattr(pattern, 'pattern', None)
+        if (not isinstance(source, str)
+                or pattern.flags & (re.IGNORECASE | re.VERBOSE)):
+            return None
+        first = _get_first_chars_of(source)
+        if first is None:
+            return None
+        chars |= first
+    decimal = '\\d' in chars
+    chars.discard('\\d')
+    return frozenset(chars), decimal
+
+
+def _get_first_chars_of(source):
+    """
+    return the set of characters a match of the regex source can start with
+    ('\\d' standing for any decimal digit), or None if that isn't obvious
+
+    """
+    structure = list(_iter_structure(source))
+    bars = [i for i, char, depth in structure if char == '|' and depth == 0]
+    if bars:
+        chars = set()
+        for start, end in zip([-1] + bars, bars + [len(source)]):
+            first = _get_first_chars_of(source[start + 1:end])
+            if first is None:
+                return None
+            chars |= first
+        return chars
+    if source.startswith('^'):
+        source = source[1:]
+        structure = [(i - 1, char, depth) for i, char, depth in structure[1:]]
+    if source.startswith('('):
+        end = next((i for i, char, depth in structure
+                    if char == ')' and depth == 0), None)
+        if end is None:
+            return None
+        group = source[1:end]
+        if group.startswith('?:'):
+            group = group[2:]
+        elif group.startswith('?P<'):
+            group = group[group.find('>') + 1:]
+        elif group.startswith('?'):
+            # lookarounds, inline flags, etc.
+            return None
+        first, rest = _get_first_chars_of(group), source[end + 1:]
+    elif source.startswith('\\d'):
+        first, rest = {'\\d'}, source[2:]
+    elif source.startswith('['):
+        end = source.find(']')
+        first, rest = set(source[1:end]), source[end + 1:]
+        if end < 2 or first & _SPECIAL_CHARS or '-' in first:
+            # empty, negated, ranges, escapes, etc.
+            return None
+    elif source and source[0] not in _SPECIAL_CHARS:
+        first, rest = {source[0]}, source[1:]
+    else:
+        return None
+    if first is None or rest[:1] in ('?', '*') or rest[:2] in ('{0', '{,'):
+        # the first character is optional
+        return None
+    return first
+
+
+def _iter_structure(source):
+    """
+    yield (index, char, depth) for each character of the regex source
+    outside of escapes and character classes, depth being the number of
+    groups the character is in (a group's parentheses are at the outer depth)
+
+    """
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 1
+        elif in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            # a ] right after [ (or [^) is a literal
+            if source[i + 1:i + 2] == '^':
+                i += 1
+            if source[i + 1:i + 2] == ']':
+                i += 1
+        elif char == ')':
+            depth -= 1
+            yield i, char, depth
+        else:
+            yield i, char, depth
+            if char == '(':
+                depth += 1
+        i += 1
+
+
 META_ATTRS = ('properties', 'string_conversions', 'update_properties')
+# the jsonobject.profiling.Profiler running, if any
+_profiler = None
+
+
+class PropertyPlan(namedtuple('PropertyPlan', [
+        'property', 'wrap', 'unwrap', 'validate', 'exclude'])):
+    """
+    A property together with its conversion methods, bound ahead of time
+
+    JsonObjectMeta compiles one of these for each property of a class
+    (plus one for dynamic properties) so that wrapping and unwrapping
+    a key is a single dict lookup followed by direct calls,
+    rather than a property lookup and a method lookup per step.
+
+    """
+    __slots__ = ()
+
+    @classmethod
+    def for_property(cls, property_):
+        return cls(
+            property=property_,
+            wrap=property_.wrap,
+            unwrap=property_.unwrap,
+            validate=property_.validate,
+            exclude=property_.exclude,
+        )
+
+
+def compile_validation_plan(wrap_plan):
+    """
+    the (key, validate) pairs for the declared properties
+    that JsonObjectBase.validate has to check
+
+    Properties whose validate could only fail for a missing required value
+    are left out unless they are required (see JsonProperty._checks_values).
+
+    """
+    return tuple(
+        (key, plan.validate) for key, plan in wrap_plan.items()
+        if plan.property._checks_values or plan.property.required
+    )
+
+
+def _wrap_kwargs(lazy, trusted, frozen):
+    """
+    the keyword arguments to pass on to wrap(), leaving out the defaults
+    so that subclasses overriding wrap(cls, obj) keep working
+
+    """
+    kwargs = {}
+    if lazy is not None:
+        kwargs['lazy'] = lazy
+    if trusted:
+        kwargs['trusted'] = trusted
+    if frozen:
+        kwargs['frozen'] = frozen
+    return kwargs
+
+
+def _wrap_owned(cls, obj, kwargs):
+    """
+    cls.wrap(obj, **kwargs) for a dict parsed or copied for the object,
+    which it can then change in place (see wrapping_owned)
+
+    """
+    token = wrapping_owned.set(True)
+    try:
+        return cls.wrap(obj, **kwargs)
+    finally:
+        wrapping_owned.reset(token)
 
 
 class JsonObjectMeta(type):
@@ -152,6 +445,15 @@ class JsonObjectMeta(type):
 
         cls._properties_by_attr = properties
         cls._properties_by_key = properties_by_name
+        cls._wrap_plan = {
+            key: PropertyPlan.for_property(property_)
+            for key, property_ in properties_by_name.items()
+        }
+        cls._dynamic_plan = PropertyPlan.for_property(
+            cls_settings.type_config.default_property)
+        cls._validation_plan = compile_validation_plan(cls._wrap_plan)
+        if _profiler is not None:
+            _profiler.instrument_class(cls)
         return cls
 
     def __configure(cls, properties=None, string_conversions=None,
@@ -171,32 +473,53 @@ class JsonObjectMeta(type):
         return cls
 
 
-class _JsonObjectPrivateInstanceVariables(object):
-
-    def __init__(self, dynamic_properties=None):
-        self.dynamic_properties = dynamic_properties or {}
-
-
-class JsonObjectBase(object, metaclass=JsonObjectMeta):
+class JsonObjectBase(ChangeTrackingMixin, metaclass=JsonObjectMeta):
 
     _allow_dynamic_properties = True
     _validate_required_lazily = False
+    _wrap_lazily = False
 
     _properties_by_attr = None
     _properties_by_key = None
+    _wrap_plan = None
+    _dynamic_plan = None
+    _validation_plan = None
 
     _string_conversions = ()
 
-    def __init__(self, _obj=None, **kwargs):
-        setattr(self, '_$', _JsonObjectPrivateInstanceVariables())
+    # per-instance state is kept to _obj and _wrapped (plus the dynamic
+    # properties' attributes); these flags are only set on an instance
+    # while they differ from the class default
+    # True if the object was wrapped from trusted data (see wrap)
+    _trusted = False
+    # True if the object was frozen as it was wrapped (see wrap),
+    # when it is compared and hashed by its JSON
+    _hashed_by_value = False
+    # True if the object was wrapped lazily from JSON it owns
+    # (see wrapping_owned), for the values wrapped later
+    _owns_json = False
 
+    def __init__(self, _obj=None, **kwargs):
         self._obj = check_type(_obj, dict,
                                'JsonObject must wrap a dict or None')
         self._wrapped = {}
 
+        trusted = wrapping_trusted.get()
+        if trusted:
+            self._trusted = True
+        if self._wrap_lazily and wrapping_owned.get():
+            self._owns_json = True
         for key, value in list(self._obj.items()):
+            if self._wrap_lazily and self.__is_deferrable(key, value):
+                # keep the key's position but leave the subtree raw
+                # until it is first accessed
+                self._wrapped[key] = _DEFERRED
+                continue
             try:
-                self.set_raw_value(key, value)
+                if trusted:
+                    self.__set_trusted_value(key, value)
+                else:
+                    self.set_raw_value(key, value)
             except AttributeError:
                 raise WrappingAttributeError(
                     "can't set attribute corresponding to {key!r} "
@@ -228,10 +551,25 @@ class JsonObjectBase(object, metaclass=JsonObjectMeta):
                     d = value.default(self)
                 self[key] = d
 
+        # every value was validated as it was set, so unless required values
+        # were left for later, the object is valid if everything in it is.
+        # An overridden validate() has checks of its own that haven't run.
+        valid = (not trusted and not self._validate_required_lazily
+                 and type(self).validate is JsonObjectBase.validate)
+        for value in self._wrapped.values():
+            if isinstance(value, ChangeTrackingMixin):
+                if not value._valid:
+                    valid = False
+            elif value is _DEFERRED:
+                valid = False
+        if valid:
+            self._valid = True
+
     def set_raw_value(self, key, value):
-        wrapped = self.__wrap(key, value)
+        plan = self.__get_plan(key)
+        wrapped = self.__wrap(plan, value)
         if key in self._properties_by_key:
-            self[key] = wrapped
+            self.__set_item(key, plan, wrapped)
         else:
             setattr(self, key, wrapped)
 
@@ -239,69 +577,450 @@ class JsonObjectBase(object, metaclass=JsonObjectMeta):
     def properties(cls):
         return cls._properties_by_attr.copy()
 
-    @property
-    def __dynamic_properties(self):
-        return getattr(self, '_$').dynamic_properties
+    def __set_trusted_value(self, key, value):
+        """
+        single-pass version of set_raw_value for trusted data
+
+        The value is wrapped once and the raw value is kept as is,
+        without being unwrapped again or validated.
+
+        """
+        is_dynamic = key not in self._properties_by_key
+        if is_dynamic and not (self._allow_dynamic_properties
+                               and self.__is_dynamic_property(key)):
+            # let the regular path set (or reject) the attribute
+            self.set_raw_value(key, value)
+            return
+        plan = self.__get_plan(key)
+        wrapped = self._attach(self.__wrap(plan, value))
+        self._wrapped[key] = wrapped
+        if plan.exclude(value):
+            self._obj.pop(key, None)
+        elif getattr(wrapped, '_obj', None) is wrapped:
+            # a container storing its items once is its own raw value
+            self._obj[key] = wrapped
+        if is_dynamic:
+            super(JsonObjectBase, self).__setattr__(key, wrapped)
 
     @classmethod
-    def wrap(cls, obj):
-        self = cls(obj)
+    def wrap(cls, obj, lazy=None, trusted=False, frozen=False):
+        """
+        wrap a deserialized JSON dict
+
+        If lazy is True, nested objects and containers are left unwrapped
+        until they are first accessed (see _wrap_lazily).
+        If None, the class's own setting is used.
+
+        If trusted is True, obj is assumed to be valid JSON
+        as produced by to_json(), e.g. a document read back from the database.
+        Each value is then wrapped in a single pass: raw values are stored
+        as given rather than re-derived from the wrapped ones,
+        and validation is deferred to the next validate() or to_json().
+
+        If frozen is True, the object is frozen once wrapped (see freeze).
+        Since it can't have been put in a set or used as a dict key before,
+        it and the objects in it are then compared and hashed by their JSON:
+        such frozen objects of the same class are equal if their JSON text is.
+        A set of objects that would then be equal raises BadValueError.
+
+        """
+        token = wrapping_trusted.set(True) if trusted else None
+        try:
+            if lazy is None:
+                self = cls(obj)
+            else:
+                self = cls.__new__(cls)
+                self._wrap_lazily = lazy
+                self.__init__(obj)
+        finally:
+            if token is not None:
+                wrapping_trusted.reset(token)
+        if frozen:
+            self.validate()
+            self._freeze(by_value=True)
         return self
 
+    @classmethod
+    def wrap_json(cls, data, lazy=None, trusted=False, frozen=False):
+        """
+        wrap a JSON document given as str or bytes
+
+        This is cls.wrap(json.loads(data)), with lazy, trusted and frozen
+        passed on to wrap() when given, except that the parsed dict
+        belongs to the object, so containers of values left unchanged by
+        wrapping (e.g. ListProperty(str)) store their items once.
+
+        """
+        return _wrap_owned(cls, json.loads(data),
+                           _wrap_kwargs(lazy, trusted, frozen))
+
+    @classmethod
+    def iter_wrap(cls, fp, format='jsonl', lazy=None, trusted=False,
+                  frozen=False):
+        """
+        wrap the JSON dicts read from a file-like object one at a time
+
+        format is 'jsonl' for one JSON dict per line (JSON Lines)
+        or 'array' for a single JSON array of dicts.
+        Either way the input is read incrementally rather than loaded
+        all at once. lazy, trusted and frozen are passed on to wrap()
+        when given, and each dict is wrapped as in wrap_json.
+
+        """
+        if format == 'jsonl':
+            objs = iter_json_lines(fp)
+        elif format == 'array':
+            objs = iter_json_array(fp)
+        else:
+            raise ValueError(
+                "format must be 'jsonl' or 'array', not {!r}".format(format))
+        kwargs = _wrap_kwargs(lazy, trusted, frozen)
+        return (_wrap_owned(cls, obj, kwargs) for obj in objs)
+
+    @classmethod
+    def wrap_many(cls, objs, workers=None, chunk_size=100,
+                  lazy=None, trusted=False, frozen=False):
+        """
+        wrap each of an iterable of deserialized JSON dicts
+
+        Returns a list with, in the same order as objs, the wrapped object
+        for each dict, or the exception raised while wrapping it,
+        so that one bad dict doesn't abort the rest of the batch.
+        lazy, trusted and frozen are passed on to wrap() when given.
+
+        With workers, the dicts are wrapped in chunks of chunk_size
+        on a pool of that many threads. This only pays off on
+        free-threaded builds of Python.
+
+        """
+        # resolve deferred item types (e.g. ListProperty(lambda: Cls))
+        # once for the whole batch, rather than racing to on each thread
+        _resolve_item_types(cls)
+        objs = list(objs)
+        kwargs = _wrap_kwargs(lazy, trusted, frozen)
+
+        def wrap_chunk(start):
+            results = []
+            for obj in objs[start:start + chunk_size]:
+                try:
+                    results.append(cls.wrap(obj, **kwargs))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        starts = range(0, len(objs), chunk_size)
+        if workers is None:
+            chunks = map(wrap_chunk, starts)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(wrap_chunk, starts))
+        return [result for chunk in chunks for result in chunk]
+
+    def __is_deferrable(self, key, value):
+        return (key in self._properties_by_key
+                and isinstance(value, (dict, list)))
+
+    def _materialize(self, key):
+        """
+        wrap a value that was deferred by lazy wrapping and return it
+
+        """
+        owned_token = wrapping_owned.set(True) if self._owns_json else None
+        try:
+            if self._trusted:
+                token = wrapping_trusted.set(True)
+                try:
+                    self.__set_trusted_value(key, self._obj[key])
+                finally:
+                    wrapping_trusted.reset(token)
+            else:
+                self.set_raw_value(key, self._obj[key])
+        finally:
+            if owned_token is not None:
+                wrapping_owned.reset(owned_token)
+        return self._wrapped[key]
+
+    def _materialize_all(self):
+        for key, value in list(self._wrapped.items()):
+            if value is _DEFERRED:
+                self._materialize(key)
+
     def validate(self, required=True):
-        for key, value in self._wrapped.items():
-            self.__get_property(key).validate(value, required=required)
+        if self._valid:
+            return
+        self._materialize_all()
+        wrapped = self._wrapped
+        for key, validate in self._validation_plan:
+            validate(wrapped[key], required=required)
+        properties_by_key = self._properties_by_key
+        if len(wrapped) > len(properties_by_key):
+            validate = self._dynamic_plan.validate
+            for key, value in wrapped.items():
+                if key not in properties_by_key:
+                    validate(value, required=required)
+        if required:
+            self._valid = True
+
+    def to_json(self, copy=True, validate=True):
+        """
+        return the JSON representation of the object
 
-    def to_json(self):
-        self.validate()
-        return copy.deepcopy(self._obj)
+        With copy=False the object's internal raw dict is returned
+        instead of a copy of it. It must be treated as read-only,
+        and it reflects any later changes made to the object.
+
+        With validate=False the object is not validated first,
+        e.g. because it hasn't been changed since it was last validated.
+
+        """
+        if validate:
+            self.validate()
+        if copy:
+            return copy_json(self._obj)
+        return self._obj
 
-    def __get_property(self, key):
+    def to_json_string(self, compact=False, sort_keys=False, validate=True):
+        """
+        return the JSON representation of the object as JSON text
+
+        The internal raw dict is encoded directly, saving the copy
+        that json.dumps(obj.to_json()) would make first.
+        With compact=True, no spaces follow the separators.
+
+        """
+        if validate:
+            self.validate()
+        if not self._frozen:
+            return self.__dumps(compact, sort_keys)
+        # a frozen object's JSON text never changes, so it is kept
+        json_strings = self.__dict__.setdefault('_json_strings', {})
+        key = (compact, sort_keys)
         try:
-            return self._properties_by_key[key]
+            return json_strings[key]
         except KeyError:
-            return DefaultProperty(type_config=get_settings(self).type_config)
+            text = json_strings[key] = self.__dumps(compact, sort_keys)
+            return text
+
+    def __dumps(self, compact, sort_keys):
+        return json.dumps(
+            self._obj,
+            separators=(',', ':') if compact else None,
+            sort_keys=sort_keys,
+        )
+
+    def to_json_bytes(self, compact=False, sort_keys=False, validate=True):
+        """
+        return the JSON representation of the object as UTF-8 encoded JSON text
+
+        """
+        return self.to_json_string(
+            compact=compact, sort_keys=sort_keys, validate=validate,
+        ).encode('utf-8')
+
+    def freeze(self):
+        """
+        validate the object, then make it and everything in it read-only
 
-    def __wrap(self, key, value):
-        property_ = self.__get_property(key)
+        Changing a frozen object, or any object or container in it,
+        raises FrozenObjectError.  A frozen object can be shared,
+        e.g. between threads, since reading it changes nothing either,
+        and its JSON text (see to_json_string) is only encoded once.
+        Its containers can be hashed, but the object keeps being compared
+        and hashed by identity, as it may already be in a set or a dict
+        (unlike objects wrapped with frozen=True).
+        Copies of frozen objects aren't frozen.
 
+        Returns the object.
+
+        """
+        self.validate()
+        self._freeze()
+        return self
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if (self._hashed_by_value and type(other) is type(self)
+                and other._hashed_by_value):
+            return self.__canonical_json() == other.__canonical_json()
+        return NotImplemented
+
+    def __hash__(self):
+        if self._hashed_by_value:
+            return hash(self.__canonical_json())
+        return object.__hash__(self)
+
+    def _freeze(self, by_value=False):
+        if by_value and not self._frozen:
+            self._hashed_by_value = True
+        super(JsonObjectBase, self)._freeze(by_value)
+
+    def __canonical_json(self):
+        # objects frozen by value are both compared and hashed by this text,
+        # so that e.g. 1 and 1.0 (equal, but written differently)
+        # can't make equal objects hash differently
+        return self.to_json_string(compact=True, sort_keys=True, validate=False)
+
+    def get_changes(self):
+        """
+        return the changes made since the last call to checkpoint()
+
+        Changes are only recorded once checkpoint() has been called,
+        so that objects that aren't asked for their changes don't pay
+        for keeping the values from before them.
+
+        Each change is a (path, old, new) tuple, where path is a tuple
+        of the keys and indexes leading to the changed value and
+        old and new are raw JSON values, MISSING for a key that was
+        added or removed. Arrays and sets that were changed
+        are reported as a whole rather than item by item.
+
+        Only the parts of the object that changed are looked at.
+
+        """
+        changes = []
+        if self._has_changes:
+            self._collect_changes((), changes)
+        return changes
+
+    def get_patch(self):
+        """
+        return the changes made since the last call to checkpoint()
+        as a JSON patch (RFC 6902)
+
+        """
+        patch = []
+        for path, old, new in self.get_changes():
+            pointer = ''.join(
+                '/' + str(key).replace('~', '~0').replace('/', '~1')
+                for key in path
+            )
+            if old is MISSING:
+                patch.append({'op': 'add', 'path': pointer, 'value': new})
+            elif new is MISSING:
+                patch.append({'op': 'remove', 'path': pointer})
+            else:
+                patch.append({'op': 'replace', 'path': pointer, 'value': new})
+        return patch
+
+    def checkpoint(self):
+        """
+        start recording changes, forgetting any made so far
+
+        get_changes() and get_patch() will only report changes made after this,
+        e.g. once the object has been wrapped or its changes have been saved.
+
+        """
+        self._track_changes()
+        self._clear_changes()
+
+    def __copy__(self):
+        # like copying its JSON, as copy.copy used to, a copy shares nothing
+        # that can be changed with the original
+        return self.__clone({})
+
+    def __deepcopy__(self, memo):
+        return self.__clone(memo)
+
+    def __clone(self, memo):
+        """
+        deep copy self without wrapping or validating anything again
+
+        The wrapped and raw values are copied in parallel (see copy_item).
+        The copy starts with no recorded changes.
+
+        """
+        cls = self.__class__
+        new = cls.__new__(cls)
+        # set attributes directly, bypassing __setattr__
+        state = new.__dict__
+        memo[id(self)] = new
+        wrapped_values = self._wrapped
+        for name, value in self.__dict__.items():
+            # the remaining attributes are flags such as _trusted and _wrap_lazily,
+            # and any set by subclasses; dynamic properties are copied below
+            if name not in _CLONED_STATE and name not in wrapped_values:
+                state[name] = deepcopy(value, memo)
+
+        copies = {}
+        obj = state['_obj'] = {}
+        for key, raw in self._obj.items():
+            wrapped = wrapped_values.get(key, MISSING)
+            if wrapped is _DEFERRED:
+                copies[key] = wrapped
+                obj[key] = copy_json(raw)
+            elif wrapped is MISSING:
+                obj[key] = copy_json(raw)
+            else:
+                copies[key], obj[key] = copy_item(new, wrapped, raw, memo)
+        if len(copies) < len(wrapped_values):
+            for key, wrapped in wrapped_values.items():
+                if key not in copies:
+                    # excluded from _obj, e.g. by exclude_if_none
+                    copies[key], _ = copy_item(new, wrapped, None, memo)
+        state['_wrapped'] = {key: copies[key] for key in wrapped_values}
+        properties_by_key = self._properties_by_key
+        for key in wrapped_values:
+            if key not in properties_by_key:
+                state[key] = copies[key]
+        if self._valid:
+            state['_valid'] = True
+        return new
+
+    def _iter_tracked_children(self):
+        for key, value in self._wrapped.items():
+            if isinstance(value, ChangeTrackingMixin):
+                yield key, value
+
+    def __get_plan(self, key):
+        try:
+            return self._wrap_plan[key]
+        except KeyError:
+            return self._dynamic_plan
+
+    def __wrap(self, plan, value):
         if value is None:
             return None
 
-        return property_.wrap(value)
+        return plan.wrap(value)
 
-    def __unwrap(self, key, value):
-        property_ = self.__get_property(key)
+    def __unwrap(self, plan, value):
         if value is None:
             wrapped, unwrapped = None, None
         else:
-            wrapped, unwrapped = property_.unwrap(value)
+            wrapped, unwrapped = plan.unwrap(value)
 
+        required = not self._validate_required_lazily
         if isinstance(wrapped, JsonObjectBase):
             # validate containers but not objects
-            recursive_kwargs = {'recursive': False}
+            plan.validate(wrapped, required=required, recursive=False)
         else:
             # omit the argument for backwards compatibility of custom properties
             # that do not contain `recursive` in their signature
             # and let the default of True shine through
-            recursive_kwargs = {}
-        property_.validate(
-            wrapped,
-            required=not self._validate_required_lazily,
-            **recursive_kwargs,
-        )
+            plan.validate(wrapped, required=required)
         return wrapped, unwrapped
 
     def __setitem__(self, key, value):
-        wrapped, unwrapped = self.__unwrap(key, value)
-        self._wrapped[key] = wrapped
-        if self.__get_property(key).exclude(unwrapped):
+        self._check_not_frozen()
+        # augmented assignments such as obj.ids -= ids set the container
+        # back after changing it, which it has recorded itself
+        record = self._tracking and self._wrapped.get(key, MISSING) is not value
+        old = self._obj.get(key, MISSING) if record else None
+        self.__set_item(key, self.__get_plan(key), value)
+        if record:
+            self._record_key_change(key, old)
+
+    def __set_item(self, key, plan, value):
+        wrapped, unwrapped = self.__unwrap(plan, value)
+        self._wrapped[key] = self._attach(wrapped)
+        self._mark_dirty()
+        if plan.exclude(unwrapped):
             self._obj.pop(key, None)
         else:
             self._obj[key] = unwrapped
         if key not in self._properties_by_key:
             assert key not in self._properties_by_attr
-            self.__dynamic_properties[key] = wrapped
             super(JsonObjectBase, self).__setattr__(key, wrapped)
 
     def __is_dynamic_property(self, name):
@@ -312,7 +1031,10 @@ class JsonObjectBase(object, metaclass=JsonObjectMeta):
         )
 
     def __setattr__(self, name, value):
-        if self.__is_dynamic_property(name):
+        if name in self._properties_by_attr:
+            # the common case: let the property's descriptor handle it
+            super(JsonObjectBase, self).__setattr__(name, value)
+        elif self.__is_dynamic_property(name):
             if self._allow_dynamic_properties:
                 self[name] = value
             else:
@@ -329,10 +1051,12 @@ class JsonObjectBase(object, metaclass=JsonObjectMeta):
         else:
             if not self.__is_dynamic_property(key):
                 raise KeyError(key)
-            del self._obj[key]
+            self._check_not_frozen()
+            old = self._obj.pop(key, MISSING)
             del self._wrapped[key]
-            del self.__dynamic_properties[key]
+            self._mark_dirty()
             super(JsonObjectBase, self).__delattr__(key)
+            self._record_key_change(key, old)
 
     def __delattr__(self, name):
         if name in self._properties_by_attr:
@@ -374,6 +1098,7 @@ class _LimitedDictInterfaceMixin(object):
         return self._wrapped.keys()
 
     def items(self):
+        self._materialize_all()
         return self._wrapped.items()
 
     def iteritems(self):
@@ -383,7 +1108,10 @@ class _LimitedDictInterfaceMixin(object):
         return item in self._wrapped
 
     def __getitem__(self, item):
-        return self._wrapped[item]
+        value = self._wrapped[item]
+        if value is _DEFERRED:
+            value = self._materialize(item)
+        return value
 
     def __iter__(self):
         return iter(self._wrapped)
@@ -392,5 +1120,25 @@ class _LimitedDictInterfaceMixin(object):
         return len(self._wrapped)
 
 
+def _resolve_item_types(cls, seen=None):
+    """
+    resolve the deferred item types of cls's properties
+    and of the classes they refer to
+
+    """
+    seen = set() if seen is None else seen
+    if cls in seen:
+        return
+    seen.add(cls)
+    for property_ in cls._properties_by_key.values():
+        while isinstance(property_, JsonContainerProperty):
+            property_ = property_.item_wrapper
+        # ObjectProperty
+        item_type = getattr(property_, 'item_type', None)
+        if isinstance(item_type, JsonObjectMeta):
+            _resolve_item_types(item_type, seen)
+
+
 def get_dynamic_properties(obj):
-    return getattr(obj, '_$').dynamic_properties.copy()
+    return {key: value for key, value in obj._wrapped.items()
+            if key not in obj._properties_by_key}
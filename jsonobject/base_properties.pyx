@@ -1,26 +1,38 @@
+import functools
 import inspect
 from jsonobject.exceptions import BadValueError
+from jsonobject.utils import _DEFERRED
 
 def function_name(f):
     return f.__name__
 
 
+def _constant(value):
+    return value
+
+
 class JsonProperty(object):
 
     default = None
     type_config = None
+    # True if wrap and unwrap return JSON values unchanged,
+    # so that containers can store such items once (see JsonArray)
+    _unchanged_by_wrap = False
+    # False if wrapped values can never be objects or containers,
+    # so that validate needn't look for anything to validate recursively
+    _may_contain_objects = True
 
     def __init__(self, default=Ellipsis, name=None, choices=None,
                  required=False, exclude_if_none=False, validators=None,
                  verbose_name=None, type_config=None):
-        validators = validators or ()
         self.name = name
         if default is Ellipsis:
             default = self.default
         if callable(default):
             self.default = default
         else:
-            self.default = lambda: default
+            # rather than a lambda, so that properties can be pickled
+            self.default = functools.partial(_constant, default)
         self.choices = choices
         self.choice_keys = []
         if choices:
@@ -28,12 +40,31 @@ class JsonProperty(object):
                 if isinstance(choice, tuple):
                     choice, _ = choice
                 self.choice_keys.append(choice)
+        try:
+            self._choice_set = frozenset(self.choice_keys)
+        except TypeError:
+            # unhashable choices are looked up in the list
+            self._choice_set = self.choice_keys
         self.required = required
         self.exclude_if_none = exclude_if_none
+        if not validators:
+            validators = ()
+        elif hasattr(validators, '__iter__'):
+            validators = tuple(validators)
+        else:
+            validators = (validators,)
         self._validators = validators
         self.verbose_name = verbose_name
         if type_config:
             self.type_config = type_config
+        cls = type(self)
+        # whether validate checks more than that a required value is given:
+        # if not, values that aren't empty needn't be validated at all
+        self._checks_values = bool(
+            self.choice_keys or validators or self._may_contain_objects
+            or cls.validate is not JsonProperty.validate
+            or cls._custom_validate is not JsonProperty._custom_validate
+        )
 
     def init_property(self, default_name, type_config):
         self.name = self.name or default_name
@@ -62,11 +93,14 @@ class JsonProperty(object):
         return self.wrap(value)
 
     def __get__(self, instance, owner):
-        if instance:
-            assert self.name in instance
-            return instance[self.name]
-        else:
+        if instance is None:
             return self
+        # read straight from the instance's wrapped values
+        # rather than going through its __contains__ and __getitem__
+        value = instance._wrapped[self.name]
+        if value is _DEFERRED:
+            value = instance._materialize(self.name)
+        return value
 
     def __set__(self, instance, value):
         instance[self.name] = value
@@ -92,11 +126,16 @@ class JsonProperty(object):
         return value is None
 
     def validate(self, value, required=True, recursive=True):
-        if (self.choice_keys and value not in self.choice_keys
-                and value is not None):
-            raise BadValueError(
-                '{0!r} not in choices: {1!r}'.format(value, self.choice_keys)
-            )
+        if self.choice_keys and value is not None:
+            try:
+                is_choice = value in self._choice_set
+            except TypeError:
+                # an unhashable value
+                is_choice = value in self.choice_keys
+            if not is_choice:
+                raise BadValueError(
+                    '{0!r} not in choices: {1!r}'.format(value, self.choice_keys)
+                )
 
         if not self.empty(value):
             self._custom_validate(value)
@@ -104,16 +143,34 @@ class JsonProperty(object):
             raise BadValueError(
                 'Property {0} is required.'.format(self.name)
             )
-        if recursive and hasattr(value, 'validate'):
+        if recursive and self._may_contain_objects and hasattr(value, 'validate'):
             value.validate(required=required)
 
     def _custom_validate(self, value):
-        if self._validators:
-            if hasattr(self._validators, '__iter__'):
-                for validator in self._validators:
-                    validator(value)
-            else:
-                self._validators(value)
+        for validator in self._validators:
+            validator(value)
+
+
+def validate_items(wrapper, items, required=True):
+    """
+    validate a container's items with wrapper, its item property
+
+    Items are skipped when validating them couldn't fail (see _checks_values),
+    so that e.g. a long list of strings is validated in a single scan
+    for the None that a required item can't be.
+
+    """
+    if wrapper._checks_values:
+        for item in items:
+            wrapper.validate(item, required=required)
+    elif required and wrapper.required:
+        if type(wrapper).empty is JsonProperty.empty:
+            if None in items:
+                wrapper.validate(None, required=required)
+        else:
+            for item in items:
+                if wrapper.empty(item):
+                    wrapper.validate(item, required=required)
 
 
 class JsonContainerProperty(JsonProperty):
@@ -121,16 +178,24 @@ class JsonContainerProperty(JsonProperty):
     _type = default = None
     container_class = None
 
-    def __init__(self, item_type=None, **kwargs):
+    def __init__(self, item_type=None, string_conversions=None, **kwargs):
         self._item_type_deferred = item_type
+        # e.g. () to leave free-text strings in the container unconverted
+        self._string_conversions = string_conversions
         super(JsonContainerProperty, self).__init__(**kwargs)
 
     def init_property(self, **kwargs):
         super(JsonContainerProperty, self).init_property(**kwargs)
+        self._apply_string_conversions()
         if not inspect.isfunction(self._item_type_deferred):
             # trigger validation
             self.item_wrapper
 
+    def _apply_string_conversions(self):
+        if self._string_conversions is not None:
+            self.type_config = self.type_config.replace(
+                string_conversions=self._string_conversions)
+
     def to_item_wrapper(self, item_type):
         from jsonobject.base import JsonObjectMeta
         from .properties import ObjectProperty
@@ -142,6 +207,10 @@ class JsonContainerProperty(JsonProperty):
             item_wrapper = item_type
             if item_wrapper.type_config is None:
                 item_wrapper.type_config = self.type_config
+                if isinstance(item_wrapper, JsonContainerProperty):
+                    # item properties aren't initialized like properties
+                    # of a class, so their own conversions are applied here
+                    item_wrapper._apply_string_conversions()
             return item_wrapper
         elif issubclass(item_type, JsonProperty):
             return item_type(type_config=self.type_config, required=True)
@@ -158,13 +227,19 @@ class JsonContainerProperty(JsonProperty):
 
     @property
     def item_wrapper(self):
-        if hasattr(self, '_item_type_deferred'):
-            if inspect.isfunction(self._item_type_deferred):
-                self._item_wrapper = self.to_item_wrapper(self._item_type_deferred())
-            else:
-                self._item_wrapper = self.to_item_wrapper(self._item_type_deferred)
-            del self._item_type_deferred
-        return self._item_wrapper
+        try:
+            return self._item_wrapper
+        except AttributeError:
+            pass
+        item_type = self._item_type_deferred
+        if inspect.isfunction(item_type):
+            item_type = item_type()
+            # replaced rather than deleted, so that threads racing
+            # to resolve it all succeed
+            self._item_type_deferred = item_type
+        # and they all get the wrapper stored first
+        return self.__dict__.setdefault(
+            '_item_wrapper', self.to_item_wrapper(item_type))
 
     def empty(self, value):
         return not value
@@ -208,21 +283,33 @@ class DefaultProperty(JsonProperty):
             return obj, None
 
     def value_to_property(self, value):
-        map_types_properties = self.type_config.properties
         if value is None:
             return None
-        elif type(value) in map_types_properties:
-            return map_types_properties[type(value)](
-                type_config=self.type_config)
+        # the property for each type is created once per type config
+        # and shared by all values of that type
+        property_cache = self.type_config.property_cache
+        try:
+            return property_cache[type(value)]
+        except KeyError:
+            pass
+        map_types_properties = self.type_config.properties
+        if type(value) in map_types_properties:
+            prop_class = map_types_properties[type(value)]
         else:
             for value_type, prop_class in map_types_properties.items():
                 if isinstance(value, value_type):
-                    return prop_class(type_config=self.type_config)
+                    break
             else:
                 raise BadValueError(
                     'value {0!r} not in allowed types: {1!r}'.format(
                         value, map_types_properties.keys())
                 )
+        property_ = prop_class(type_config=self.type_config)
+        if isinstance(property_, JsonContainerProperty):
+            # resolve it now rather than racing to when shared
+            property_.item_wrapper
+        # threads racing to create it all get the property stored first
+        return property_cache.setdefault(type(value), property_)
 
     def value_to_python(self, value):
         """
@@ -237,23 +324,29 @@ class DefaultProperty(JsonProperty):
 
         """
         if isinstance(value, str):
-            convert = None
-            for pattern, _convert in self.type_config.string_conversions:
-                if pattern.match(value):
-                    convert = _convert
-                    break
-
-            if convert is not None:
-                try:
-                    #sometimes regex fail so return value
-                    value = convert(value)
-                except Exception:
-                    pass
+            value = self.type_config.convert_string(value)
         return value
 
 
 class AssertTypeProperty(JsonProperty):
     _type = None
+    _may_contain_objects = False
+    # values of exactly these types are returned unchanged by selective_coerce
+    # and always pass assert_type, so wrap and unwrap can skip both
+    _exact_types = ()
+
+    def __init__(self, *args, **kwargs):
+        super(AssertTypeProperty, self).__init__(*args, **kwargs)
+        cls = type(self)
+        declared_by = next(base for base in cls.__mro__
+                           if '_exact_types' in vars(base))
+        if (cls.selective_coerce is not declared_by.selective_coerce
+                or cls.assert_type is not declared_by.assert_type
+                or cls.wrap is not declared_by.wrap
+                or cls.unwrap is not declared_by.unwrap):
+            # a subclass changed the conversion, so the shortcuts don't hold
+            self._exact_types = ()
+            self._unchanged_by_wrap = False
 
     def assert_type(self, obj):
         if obj is None:
@@ -267,11 +360,15 @@ class AssertTypeProperty(JsonProperty):
         return obj
 
     def wrap(self, obj):
+        if type(obj) in self._exact_types:
+            return obj
         obj = self.selective_coerce(obj)
         self.assert_type(obj)
         return obj
 
     def unwrap(self, obj):
+        if type(obj) in self._exact_types:
+            return obj, obj
         obj = self.selective_coerce(obj)
         self.assert_type(obj)
         return obj, obj
@@ -280,6 +377,7 @@ class AssertTypeProperty(JsonProperty):
 class AbstractDateProperty(JsonProperty):
 
     _type = None
+    _may_contain_objects = False
 
     def __init__(self, exact=False, *args, **kwargs):
         super(AbstractDateProperty, self).__init__(*args, **kwargs)
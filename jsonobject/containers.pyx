@@ -1,8 +1,97 @@
-from jsonobject.base_properties import DefaultProperty
-from jsonobject.utils import check_type, SimpleDict
+from functools import cmp_to_key
+from jsonobject.base_properties import validate_items
+from jsonobject.exceptions import BadValueError
+from jsonobject.utils import (
+    ChangeTrackingMixin,
+    check_type,
+    copy_item,
+    copy_json,
+    MISSING,
+    SimpleDict,
+    wrapping_owned,
+    wrapping_trusted,
+)
+
+
+def _single_storage(wrapper):
+    """
+    whether a container's items can be stored once, serving as both
+    the wrapped and the raw values, because wrapper leaves them unchanged
+
+    The container then takes the place of the list or dict it wraps in its
+    parent's raw JSON, so this is only done when that JSON isn't the caller's
+    (see wrapping_owned).
+
+    """
+    return (getattr(wrapper, '_unchanged_by_wrap', False)
+            and wrapping_owned.get())
+
+
+def _unpickle_container(cls, obj, wrapper, type_config):
+    """
+    rebuild a pickled container from its JSON
+
+    The JSON was taken from a container, so it is wrapped trusted,
+    and it was unpickled for the container, which owns it.
+
+    """
+    token = wrapping_trusted.set(True)
+    owned_token = wrapping_owned.set(True)
+    try:
+        return cls(obj, wrapper=wrapper, type_config=type_config)
+    finally:
+        wrapping_owned.reset(owned_token)
+        wrapping_trusted.reset(token)
+
+
+def _reduce_container(container):
+    wrapper = container._wrapper
+    if wrapper is container._type_config.default_property:
+        wrapper = None
+    return _unpickle_container, (type(container), copy_json(container._obj),
+                                 wrapper, container._type_config)
+
+
+def _check_hashable(container):
+    if not container._frozen:
+        raise TypeError("unhashable type: '{}' (unless frozen)".format(
+            type(container).__name__))
+
+
+def _set_path(json, path, value):
+    """
+    set the value at path in json, deleting it if value is MISSING
+
+    """
+    for key in path[:-1]:
+        json = json[key]
+    if value is MISSING:
+        del json[path[-1]]
+    else:
+        json[path[-1]] = value
+
+
+def _raw_value(item, wrapped):
+    """
+    the raw value to keep for item once it has been wrapped
+
+    A container storing its items once is its own raw value,
+    taking the place of the list or dict it was wrapped from.
+
+    """
+    if wrapped is not item and getattr(wrapped, '_obj', None) is wrapped:
+        return wrapped
+    return item
+
+
+class JsonArray(ChangeTrackingMixin, list):
+    """
+    A list of wrapped values kept in sync with _obj, the list of raw values
 
+    If the items' wrapper leaves them unchanged (e.g. ListProperty(str)),
+    the items are stored once and _obj is the JsonArray itself.
 
-class JsonArray(list):
+    """
     def __new__(cls, _obj=None, wrapper=None, type_config=None):
         if _obj is not None and wrapper is None and type_config is None:
             return list(_obj) if not isinstance(_obj, list) else _obj
@@ -15,140 +104,246 @@ class JsonArray(list):
 
         assert type_config is not None
         self._type_config = type_config
-        self._wrapper = (
-            wrapper or
-            DefaultProperty(type_config=self._type_config)
-        )
-        for item in self._obj:
-            super(JsonArray, self).append(self._wrapper.wrap(item))
-
-    def __getstate__(self):
-        # This breaks symmetry with JsonObject.__getstate__(), which
-        # calls and returns self.to_json(). Here the JSON-y value,
-        # self._obj, is not copied because it will be repopulated by
-        # deepcopy/pickle list reconstruction logic, which is done
-        # after obj.__setstate__(data).
-        data = self.__dict__.copy()
-        data["_obj"] = []
-        return data
+        self._wrapper = wrapper or self._type_config.default_property
+        if _single_storage(self._wrapper):
+            super(JsonArray, self).extend(map(self._wrapper.wrap, self._obj))
+            self._obj = self
+            return
+        for i, item in enumerate(self._obj):
+            wrapped = self._wrapper.wrap(item)
+            super(JsonArray, self).append(self._attach(wrapped))
+            if wrapped is not item:
+                self._obj[i] = _raw_value(item, wrapped)
+
+    def __reduce_ex__(self, protocol):
+        # pickle the JSON and how to wrap it, rather than both lists
+        return _reduce_container(self)
+
+    def __hash__(self):
+        _check_hashable(self)
+        return hash(tuple(self))
+
+    def __copy__(self):
+        return self.__clone(None)
+
+    def __deepcopy__(self, memo):
+        return self.__clone(memo)
+
+    def __clone(self, memo):
+        """
+        copy self without wrapping or validating its items again (see copy_item)
+
+        """
+        new = list.__new__(self.__class__)
+        if memo is not None:
+            memo[id(self)] = new
+        new._type_config = self._type_config
+        new._wrapper = self._wrapper
+        if self._obj is self:
+            # the items were left unchanged by wrapping, so they're immutable
+            super(JsonArray, new).extend(self)
+            new._obj = new
+        else:
+            new._obj = []
+            for wrapped, raw in zip(self, self._obj):
+                wrapped, raw = copy_item(new, wrapped, raw, memo)
+                super(JsonArray, new).append(wrapped)
+                new._obj.append(raw)
+        if self._valid:
+            new._valid = True
+        return new
 
     def validate(self, required=True):
-        for obj in self:
-            self._wrapper.validate(obj, required=required)
+        if self._valid:
+            return
+        validate_items(self._wrapper, self, required=required)
+        if required:
+            self._valid = True
 
     def append(self, wrapped):
+        original = self._before_change()
         wrapped, unwrapped = self._wrapper.unwrap(wrapped)
-        self._obj.append(unwrapped)
-        super(JsonArray, self).append(wrapped)
+        if self._obj is not self:
+            self._obj.append(unwrapped)
+        super(JsonArray, self).append(self._attach(wrapped))
+        self._mark_dirty()
+        self._record_change(original)
 
     def __delitem__(self, i):
+        original = self._before_change()
         super(JsonArray, self).__delitem__(i)
-        del self._obj[i]
+        if self._obj is not self:
+            del self._obj[i]
+        self._mark_dirty()
+        self._record_change(original)
+
+    def __unwrap_all(self, wrapped_list):
+        new_wrapped = []
+        unwrapped = []
+        for wrapped in wrapped_list:
+            wrapped, value = self._wrapper.unwrap(wrapped)
+            new_wrapped.append(self._attach(wrapped))
+            unwrapped.append(value)
+        return new_wrapped, unwrapped
 
     def __setitem__(self, i, wrapped):
+        original = self._before_change()
         if isinstance(i, slice):
-            new_wrapped = []
-            unwrapped = []
-            for _wrapped in wrapped:
-                _wrapped, _unwrapped = self._wrapper.unwrap(_wrapped)
-                new_wrapped.append(_wrapped)
-                unwrapped.append(_unwrapped)
+            new_wrapped, unwrapped = self.__unwrap_all(wrapped)
         else:
             new_wrapped, unwrapped = self._wrapper.unwrap(wrapped)
-        self._obj[i] = unwrapped
+            self._attach(new_wrapped)
+        if self._obj is not self:
+            self._obj[i] = unwrapped
         super(JsonArray, self).__setitem__(i, new_wrapped)
+        self._mark_dirty()
+        self._record_change(original)
 
     def extend(self, wrapped_list):
-        if wrapped_list:
-            wrapped_list, unwrapped_list = zip(
-                *map(self._wrapper.unwrap, wrapped_list)
-            )
-        else:
-            unwrapped_list = []
-        self._obj.extend(unwrapped_list)
+        original = self._before_change()
+        wrapped_list, unwrapped_list = self.__unwrap_all(wrapped_list)
+        if self._obj is not self:
+            self._obj.extend(unwrapped_list)
         super(JsonArray, self).extend(wrapped_list)
+        self._mark_dirty()
+        self._record_change(original)
 
     def insert(self, index, wrapped):
+        original = self._before_change()
         wrapped, unwrapped = self._wrapper.unwrap(wrapped)
-        self._obj.insert(index, unwrapped)
-        super(JsonArray, self).insert(index, wrapped)
+        if self._obj is not self:
+            self._obj.insert(index, unwrapped)
+        super(JsonArray, self).insert(index, self._attach(wrapped))
+        self._mark_dirty()
+        self._record_change(original)
 
     def remove(self, value):
-        i = self.index(value)
-        super(JsonArray, self).remove(value)
-        self._obj.pop(i)
+        del self[self.index(value)]
 
     def pop(self, index=-1):
-        self._obj.pop(index)
-        return super(JsonArray, self).pop(index)
+        original = self._before_change()
+        if self._obj is not self:
+            self._obj.pop(index)
+        wrapped = super(JsonArray, self).pop(index)
+        self._mark_dirty()
+        self._record_change(original)
+        return wrapped
 
     def sort(self, cmp=None, key=None, reverse=False):
-        zipped = list(zip(self, self._obj))
-        if key:
-            new_key = lambda pair: key(pair[0])
-            zipped.sort(key=new_key, reverse=reverse)
-        elif cmp:
-            new_cmp = lambda pair1, pair2: cmp(pair1[0], pair2[0])
-            zipped.sort(cmp=new_cmp, reverse=reverse)
+        if cmp and not key:
+            key = cmp_to_key(cmp)
+        original = self._before_change()
+        if self._obj is self:
+            super(JsonArray, self).sort(key=key, reverse=reverse)
         else:
-            zipped.sort(reverse=reverse)
-
-        wrapped_list, unwrapped_list = list(zip(*zipped))
-        while self:
-            self.pop()
-        super(JsonArray, self).extend(wrapped_list)
-        self._obj.extend(unwrapped_list)
+            # sort the positions by the wrapped values, then put
+            # both lists in that order
+            wrapped_list = list(self)
+            unwrapped_list = self._obj
+            if key:
+                sort_key = lambda i: key(wrapped_list[i])
+            else:
+                sort_key = wrapped_list.__getitem__
+            order = sorted(range(len(wrapped_list)), key=sort_key,
+                           reverse=reverse)
+            super(JsonArray, self).__setitem__(
+                slice(None), [wrapped_list[i] for i in order])
+            unwrapped_list[:] = [unwrapped_list[i] for i in order]
+        self._mark_dirty()
+        self._record_change(original)
 
     def reverse(self):
-        self._obj.reverse()
+        original = self._before_change()
+        if self._obj is not self:
+            self._obj.reverse()
         super(JsonArray, self).reverse()
+        self._record_change(original)
 
-    def __fix_slice(self, i, j):
-        length = len(self)
-        if j < 0:
-            j += length
-        if i < 0:
-            i += length
-        if i > length:
-            i = length
-        if j > length:
-            j = length
-        return i, j
+    def _iter_tracked_children(self):
+        for i, value in enumerate(self):
+            if isinstance(value, ChangeTrackingMixin):
+                yield i, value
 
     def __setslice__(self, i, j, sequence):
-        i, j = self.__fix_slice(i, j)
-        for _ in range(j - i):
-            self.pop(i)
-        for k, wrapped in enumerate(sequence):
-            self.insert(i + k, wrapped)
+        self[i:j] = sequence
 
     def __delslice__(self, i, j):
-        i, j = self.__fix_slice(i, j)
-        for _ in range(j - i):
-            self.pop(i)
+        del self[i:j]
 
     def __iadd__(self, b):
         self.extend(b)
         return self
 
+    def __imul__(self, n):
+        self[:] = list(self) * n
+        return self
+
+    def clear(self):
+        del self[:]
+
 
-class JsonDict(SimpleDict):
+class JsonDict(ChangeTrackingMixin, SimpleDict):
 
     def __init__(self, _obj=None, wrapper=None, type_config=None):
         super(JsonDict, self).__init__()
         self._obj = check_type(_obj, dict, 'JsonDict must wrap a dict or None')
         assert type_config is not None
         self._type_config = type_config
-        self._wrapper = (
-            wrapper or
-            DefaultProperty(type_config=self._type_config)
-        )
-        for key, value in self._obj.items():
-            self[key] = self.__wrap(key, value)
+        self._wrapper = wrapper or self._type_config.default_property
+        if _single_storage(self._wrapper):
+            for key, value in self._obj.items():
+                super(JsonDict, self).__setitem__(key, self.__wrap(key, value))
+            self._obj = self
+        elif wrapping_trusted.get():
+            # the raw values are known to be valid, so skip __setitem__'s
+            # unwrapping and store the wrapped values alongside them directly
+            for key, value in list(self._obj.items()):
+                wrapped = self.__wrap(key, value)
+                super(JsonDict, self).__setitem__(key, self._attach(wrapped))
+                if wrapped is not value:
+                    self._obj[key] = _raw_value(value, wrapped)
+        else:
+            for key, value in self._obj.items():
+                self.__set_item(key, self.__wrap(key, value))
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_container(self)
+
+    def __hash__(self):
+        _check_hashable(self)
+        return hash(frozenset(self.items()))
+
+    def __copy__(self):
+        return self.__clone(None)
+
+    def __deepcopy__(self, memo):
+        return self.__clone(memo)
+
+    def __clone(self, memo):
+        new = dict.__new__(self.__class__)
+        if memo is not None:
+            memo[id(self)] = new
+        new._type_config = self._type_config
+        new._wrapper = self._wrapper
+        if self._obj is self:
+            dict.update(new, self)
+            new._obj = new
+        else:
+            new._obj = {}
+            for key, wrapped in self.items():
+                wrapped, new._obj[key] = copy_item(
+                    new, wrapped, self._obj[key], memo)
+                super(JsonDict, new).__setitem__(key, wrapped)
+        if self._valid:
+            new._valid = True
+        return new
 
     def validate(self, required=True):
-        for obj in self.values():
-            self._wrapper.validate(obj, required=required)
+        if self._valid:
+            return
+        validate_items(self._wrapper, self.values(), required=required)
+        if required:
+            self._valid = True
 
     def __wrap(self, key, unwrapped):
         return self._wrapper.wrap(unwrapped)
@@ -159,22 +354,49 @@ class JsonDict(SimpleDict):
     def __setitem__(self, key, value):
         if isinstance(key, int):
             key = unicode(key)
+        self._check_not_frozen()
+        old = self._obj.get(key, MISSING)
+        self.__set_item(key, value)
+        self._record_key_change(key, old)
 
+    def __set_item(self, key, value):
         wrapped, unwrapped = self.__unwrap(key, value)
-        self._obj[key] = unwrapped
-        super(JsonDict, self).__setitem__(key, wrapped)
+        if self._obj is not self:
+            self._obj[key] = unwrapped
+        super(JsonDict, self).__setitem__(key, self._attach(wrapped))
+        self._mark_dirty()
 
     def __delitem__(self, key):
-        del self._obj[key]
+        self._check_not_frozen()
+        old = self._obj.get(key, MISSING)
         super(JsonDict, self).__delitem__(key)
+        if self._obj is not self:
+            del self._obj[key]
+        self._mark_dirty()
+        self._record_key_change(key, old)
 
     def __getitem__(self, key):
         if isinstance(key, int):
             key = unicode(key)
         return super(JsonDict, self).__getitem__(key)
 
+    def _iter_tracked_children(self):
+        for key, value in self.items():
+            if isinstance(value, ChangeTrackingMixin):
+                yield key, value
 
-class JsonSet(set):
+
+class JsonSet(ChangeTrackingMixin, set):
+    """
+    A set whose raw JSON is a list of its unwrapped members
+
+    _members lists the wrapped members in the order of their raw values
+    in _obj, and _index maps each of them to its position there, so that
+    members are added and removed without searching _obj.  A member is
+    removed by moving the last one into its place; bulk removals keep
+    the order of the remaining members.
+
+    """
     def __init__(self, _obj=None, wrapper=None, type_config=None):
         super(JsonSet, self).__init__()
         if isinstance(_obj, set):
@@ -182,31 +404,160 @@ class JsonSet(set):
         self._obj = check_type(_obj, list, 'JsonSet must wrap a list or None')
         assert type_config is not None
         self._type_config = type_config
-        self._wrapper = (
-            wrapper or
-            DefaultProperty(type_config=self._type_config)
-        )
-        for item in self._obj:
-            super(JsonSet, self).add(self._wrapper.wrap(item))
+        self._wrapper = wrapper or self._type_config.default_property
+        self.__set_members(
+            [self._attach(self._wrapper.wrap(item)) for item in self._obj])
+
+    def __set_members(self, members):
+        """
+        store and index members, the wrapped values of the raw values in _obj
+
+        """
+        self._index = dict(zip(members, range(len(members))))
+        if len(self._index) != len(members):
+            # drop duplicates so that each member has one raw value
+            self._index = {}
+            raw = []
+            for member, item in zip(members, self._obj):
+                if member not in self._index:
+                    self._index[member] = len(raw)
+                    raw.append(item)
+            members = list(self._index)
+            self._obj[:] = raw
+        self._members = members
+        super(JsonSet, self).clear()
+        super(JsonSet, self).update(members)
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_container(self)
+
+    def __hash__(self):
+        _check_hashable(self)
+        return hash(frozenset(self))
+
+    def _freeze(self, by_value=False):
+        has_objects = by_value and not self._frozen and any(
+            True for _ in self._iter_tracked_children())
+        super(JsonSet, self)._freeze(by_value)
+        if has_objects:
+            # objects frozen by value hash by their JSON rather than
+            # by identity, so the members are indexed again,
+            # which mustn't merge members that were distinct
+            members = list(self._members)
+            if len(set(members)) < len(members):
+                raise BadValueError(
+                    "can't wrap frozen a set whose members have the same "
+                    "JSON: {!r}".format(self._obj))
+            self.__set_members(members)
+
+    def __copy__(self):
+        return self.__clone(None)
+
+    def __deepcopy__(self, memo):
+        return self.__clone(memo)
+
+    def __clone(self, memo):
+        new = set.__new__(self.__class__)
+        if memo is not None:
+            memo[id(self)] = new
+        new._type_config = self._type_config
+        new._wrapper = self._wrapper
+        new._members = []
+        new._obj = []
+        for member, raw in zip(self._members, self._obj):
+            member, raw = copy_item(new, member, raw, memo)
+            new._members.append(member)
+            new._obj.append(raw)
+        new._index = dict(zip(new._members, range(len(new._members))))
+        super(JsonSet, new).update(new._members)
+        if self._valid:
+            new._valid = True
+        return new
 
     def validate(self, required=True):
-        for obj in self:
-            self._wrapper.validate(obj, required=required)
+        if self._valid:
+            return
+        validate_items(self._wrapper, self, required=required)
+        if required:
+            self._valid = True
 
     def add(self, wrapped):
         wrapped, unwrapped = self._wrapper.unwrap(wrapped)
         if wrapped not in self:
+            original = self._before_change()
+            self._index[wrapped] = len(self._members)
+            self._members.append(wrapped)
             self._obj.append(unwrapped)
-            super(JsonSet, self).add(wrapped)
+            super(JsonSet, self).add(self._attach(wrapped))
+            self._mark_dirty()
+            self._record_change(original)
 
     def remove(self, wrapped):
         wrapped, unwrapped = self._wrapper.unwrap(wrapped)
         if wrapped in self:
-            self._obj.remove(unwrapped)
-            super(JsonSet, self).remove(wrapped)
+            original = self._before_change()
+            self.__remove_at(self._index[wrapped])
+            self._mark_dirty()
+            self._record_change(original)
         else:
             raise KeyError(wrapped)
 
+    def __remove_at(self, i):
+        member = self._members[i]
+        last = self._members.pop()
+        last_unwrapped = self._obj.pop()
+        del self._index[member]
+        super(JsonSet, self).remove(member)
+        if i < len(self._members):
+            self._members[i] = last
+            self._obj[i] = last_unwrapped
+            self._index[last] = i
+
+    def __retain(self, keep):
+        """
+        remove the members for which keep(member) is false, in one pass
+
+        """
+        members = []
+        unwrapped = []
+        removed = []
+        for member, value in zip(self._members, self._obj):
+            if keep(member):
+                members.append(member)
+                unwrapped.append(value)
+            else:
+                removed.append(member)
+        if removed:
+            original = self._before_change()
+            self._members[:] = members
+            self._obj[:] = unwrapped
+            self._index = {member: i for i, member in enumerate(members)}
+            super(JsonSet, self).difference_update(removed)
+            self._mark_dirty()
+            self._record_change(original)
+
+    def _iter_tracked_children(self):
+        # keyed by the member's position in _obj
+        for i, value in enumerate(self._members):
+            if isinstance(value, ChangeTrackingMixin):
+                yield i, value
+
+    def _collect_changes(self, path, changes):
+        if self._original is not None:
+            super(JsonSet, self)._collect_changes(path, changes)
+            return
+        # members are reported by their position in the raw list,
+        # which isn't meaningful for a set, so a change to a member is
+        # reported as a change to the whole set instead, its old value
+        # found by undoing the members' changes on a copy
+        member_changes = []
+        super(JsonSet, self)._collect_changes((), member_changes)
+        if member_changes:
+            original = copy_json(self._obj)
+            for member_path, old, _ in member_changes:
+                _set_path(original, member_path, old)
+            changes.append((path, original, copy_json(self._obj)))
+
     def discard(self, wrapped):
         try:
             self.remove(wrapped)
@@ -214,19 +565,25 @@ class JsonSet(set):
             pass
 
     def pop(self):
-        # get first item
-        for wrapped in self:
-            break
-        else:
+        # the last member is the cheapest to remove
+        if not self._members:
             raise KeyError()
-        wrapped_, unwrapped = self._wrapper.unwrap(wrapped)
-        assert wrapped is wrapped_
-        self.remove(unwrapped)
+        wrapped = self._members[-1]
+        original = self._before_change()
+        self.__remove_at(len(self._members) - 1)
+        self._mark_dirty()
+        self._record_change(original)
         return wrapped
 
     def clear(self):
-        while self:
-            self.pop()
+        if self._members:
+            original = self._before_change()
+            del self._members[:]
+            del self._obj[:]
+            self._index.clear()
+            super(JsonSet, self).clear()
+            self._mark_dirty()
+            self._record_change(original)
 
     def __ior__(self, other):
         for wrapped in other:
@@ -240,9 +597,7 @@ class JsonSet(set):
     union_update = update
 
     def __iand__(self, other):
-        for wrapped in list(self):
-            if wrapped not in other:
-                self.remove(wrapped)
+        self.__retain(lambda wrapped: wrapped in other)
         return self
 
     def intersection_update(self, *args):
@@ -250,9 +605,7 @@ class JsonSet(set):
             self &= set(wrapped_list)
 
     def __isub__(self, other):
-        for wrapped in list(self):
-            if wrapped in other:
-                self.remove(wrapped)
+        self.__retain(lambda wrapped: wrapped not in other)
         return self
 
     def difference_update(self, *args):
@@ -260,11 +613,8 @@ class JsonSet(set):
             self -= set(wrapped_list)
 
     def __ixor__(self, other):
-        removed = set()
-        for wrapped in list(self):
-            if wrapped in other:
-                self.remove(wrapped)
-                removed.add(wrapped)
+        removed = {wrapped for wrapped in self if wrapped in other}
+        self -= removed
         self.update(other - removed)
         return self
 
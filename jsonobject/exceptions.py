@@ -8,3 +8,7 @@ class BadValueError(Exception):
 
 class WrappingAttributeError(AttributeError):
     pass
+
+
+class FrozenObjectError(TypeError):
+    """raised when changing a frozen object or container"""
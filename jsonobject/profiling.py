@@ -0,0 +1,257 @@
+"""
+Opt-in profiling of the time spent wrapping, unwrapping, validating
+and serializing each class and property
+
+    with jsonobject.profile() as profiler:
+        Application.wrap(doc)
+    print(profiler.report())
+
+or set the environment variable JSONOBJECT_PROFILE=1 to profile the whole
+process and print the report to stderr when it exits.
+
+While profiling, the conversion methods in each class's plans
+(see PropertyPlan) and JsonObjectBase's wrap, validate and to_json
+are replaced with timed versions, and the originals are put back
+when profiling stops, so profiling costs nothing when it's off.
+
+"""
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+from jsonobject import base
+from jsonobject.base import JsonObjectBase, PropertyPlan
+from jsonobject.base_properties import DefaultProperty
+
+# JsonObjectBase's methods timed per class, and what they're reported as
+_OBJECT_OPERATIONS = (
+    ('__init__', 'wrap'),
+    ('validate', 'validate'),
+    ('to_json', 'to_json'),
+    ('to_json_string', 'to_json'),
+    ('to_json_bytes', 'to_json'),
+)
+STRING_CONVERSIONS = '(string conversions)'
+_NOT_SET = object()
+
+
+class Profiler(object):
+    """
+    Counts of the calls made for each class and property,
+    and the cumulative time spent in them
+
+    The entries are named after the class ('Foo'), its properties
+    ('Foo.bar', or 'Foo.*' for its dynamic properties), the values
+    DefaultProperty wrapped by type ('DefaultProperty[str]'),
+    and STRING_CONVERSIONS for the strings tried against the
+    string conversions and those converted.
+
+    Time spent in nested calls for the same entry and operation,
+    e.g. in recursive schemas, is only counted once.
+
+    """
+    def __init__(self):
+        self._stats = {}
+        self._local = threading.local()
+        self._patches = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        if base._profiler is not None:
+            raise RuntimeError('jsonobject is already being profiled')
+        base._profiler = self
+        for name, operation in _OBJECT_OPERATIONS:
+            self._patch(JsonObjectBase, name, self._time_object_method(
+                JsonObjectBase.__dict__[name], operation))
+        for name in ('wrap', 'unwrap'):
+            self._patch(DefaultProperty, name, self._time_default_method(
+                DefaultProperty.__dict__[name], name))
+        self._patch(DefaultProperty, 'value_to_python',
+                    self._time_string_conversion(
+                        DefaultProperty.__dict__['value_to_python']))
+        classes = [JsonObjectBase]
+        seen = set()
+        while classes:
+            cls = classes.pop()
+            if cls not in seen:
+                seen.add(cls)
+                self.instrument_class(cls)
+                classes.extend(cls.__subclasses__())
+
+    def stop(self):
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            if original is _NOT_SET:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        base._profiler = None
+
+    def instrument_class(self, cls):
+        """
+        time the conversions of cls's properties until profiling stops
+
+        JsonObjectMeta calls this for the classes created while profiling.
+
+        """
+        if '_wrap_plan' not in cls.__dict__:
+            return
+        name = cls.__name__
+        wrap_plan = {
+            key: self._time_plan(plan, '{}.{}'.format(name, key))
+            for key, plan in cls._wrap_plan.items()
+        }
+        self._patch(cls, '_wrap_plan', wrap_plan)
+        self._patch(cls, '_validation_plan',
+                    base.compile_validation_plan(wrap_plan))
+        self._patch(cls, '_dynamic_plan',
+                    self._time_plan(cls._dynamic_plan, name + '.*'))
+
+    def as_dict(self):
+        """
+        {name: {operation: {'count': count, 'time': seconds}}}
+
+        """
+        result = {}
+        for (name, operation), (count, total) in self._stats.items():
+            result.setdefault(name, {})[operation] = {
+                'count': count, 'time': total}
+        return result
+
+    def report(self, limit=None):
+        """
+        a table of the entries that took the most time
+
+        """
+        rows = sorted(self._stats.items(), key=lambda item: -item[1][1])
+        if limit is not None:
+            rows = rows[:limit]
+        header = ('name', 'operation', 'calls', 'total ms', 'per call us')
+        lines = [header] + [
+            (name, operation, str(count), '{:.3f}'.format(total * 1e3),
+             '{:.3f}'.format(total / count * 1e6) if count else '-')
+            for (name, operation), (count, total) in rows
+        ]
+        widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+        return '\n'.join(
+            '  '.join(cell.ljust(width) if i < 2 else cell.rjust(width)
+                      for i, (cell, width) in enumerate(zip(line, widths))).rstrip()
+            for line in lines
+        )
+
+    def _patch(self, owner, name, value):
+        self._patches.append((owner, name, owner.__dict__.get(name, _NOT_SET)))
+        setattr(owner, name, value)
+
+    def _count(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = [0, 0.0]
+        stats[0] += 1
+
+    def _record(self, key, func, *args, **kwargs):
+        try:
+            active = self._local.active
+        except AttributeError:
+            active = self._local.active = set()
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = [0, 0.0]
+        stats[0] += 1
+        if key in active:
+            return func(*args, **kwargs)
+        active.add(key)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[1] += time.perf_counter() - start
+            active.discard(key)
+
+    def _time_plan(self, plan, name):
+        # look the methods up again, in case they are being timed too
+        plan = PropertyPlan.for_property(plan.property)
+        record = self._record
+        wrap_key = (name, 'wrap')
+        unwrap_key = (name, 'unwrap')
+        validate_key = (name, 'validate')
+
+        def wrap(value):
+            return record(wrap_key, plan.wrap, value)
+
+        def unwrap(value):
+            return record(unwrap_key, plan.unwrap, value)
+
+        def validate(value, *args, **kwargs):
+            return record(validate_key, plan.validate, value, *args, **kwargs)
+
+        return plan._replace(wrap=wrap, unwrap=unwrap, validate=validate)
+
+    def _time_object_method(self, func, operation):
+        record = self._record
+
+        @functools.wraps(func)
+        def method(obj, *args, **kwargs):
+            key = (type(obj).__name__, operation)
+            return record(key, func, obj, *args, **kwargs)
+        return method
+
+    def _time_default_method(self, func, operation):
+        record = self._record
+
+        @functools.wraps(func)
+        def method(property_, value):
+            key = ('DefaultProperty[{}]'.format(type(value).__name__), operation)
+            return record(key, func, property_, value)
+        return method
+
+    def _time_string_conversion(self, func):
+        record = self._record
+        count = self._count
+        attempt_key = (STRING_CONVERSIONS, 'attempt')
+        converted_key = (STRING_CONVERSIONS, 'converted')
+
+        @functools.wraps(func)
+        def value_to_python(property_, value):
+            if not isinstance(value, str):
+                return func(property_, value)
+            result = record(attempt_key, func, property_, value)
+            if result is not value:
+                count(converted_key)
+            return result
+        return value_to_python
+
+
+def profile():
+    """
+    profile jsonobject for the duration of a with block
+
+        with jsonobject.profile() as profiler:
+            ...
+        print(profiler.report())
+
+    """
+    return Profiler()
+
+
+def _profile_process():
+    profiler = Profiler()
+    profiler.start()
+
+    @atexit.register
+    def print_report():
+        profiler.stop()
+        print(profiler.report(), file=sys.stderr)
+
+
+if os.environ.get('JSONOBJECT_PROFILE'):
+    _profile_process()
@@ -1,5 +1,6 @@
 # DateTimeProperty, DateProperty, and TimeProperty
 # include code copied from couchdbkit
+from functools import lru_cache
 import inspect
 import sys
 import datetime
@@ -22,6 +23,8 @@ if sys.version > '3':
 
 class StringProperty(AssertTypeProperty):
     _type = (unicode, str)
+    _exact_types = (str,)
+    _unchanged_by_wrap = True
 
     def selective_coerce(self, obj):
         if isinstance(obj, str):
@@ -31,14 +34,19 @@ class StringProperty(AssertTypeProperty):
 
 class BooleanProperty(AssertTypeProperty):
     _type = bool
+    _exact_types = (bool,)
+    _unchanged_by_wrap = True
 
 
 class IntegerProperty(AssertTypeProperty):
     _type = (int, long)
+    _exact_types = (int,)
+    _unchanged_by_wrap = True
 
 
 class FloatProperty(AssertTypeProperty):
     _type = float
+    _exact_types = (float,)
 
     def selective_coerce(self, obj):
         if isinstance(obj, (int, long)):
@@ -48,6 +56,8 @@ class FloatProperty(AssertTypeProperty):
 
 class DecimalProperty(JsonProperty):
 
+    _may_contain_objects = False
+
     def wrap(self, obj):
         return decimal.Decimal(obj)
 
@@ -61,11 +71,87 @@ class DecimalProperty(JsonProperty):
         return obj, unicode(obj)
 
 
+# Fast paths for the canonical ISO formats written by the properties below.
+# Each returns None for anything else (including out-of-range values),
+# which is then left to strptime, so that results and error messages
+# are exactly those of strptime. Parsed values are immutable,
+# so they are cached for the repeated dates common in bulk data.
+
+def _is_digits(value):
+    return value.isdigit() and value.isascii()
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_date(value):
+    # YYYY-MM-DD
+    if (len(value) == 10 and value[4] == '-' and value[7] == '-'
+            and _is_digits(value[:4] + value[5:7] + value[8:])):
+        try:
+            return datetime.date(
+                int(value[:4]), int(value[5:7]), int(value[8:]))
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_datetime(value, exact):
+    # YYYY-MM-DDTHH:MM:SS, ignoring anything after (non-exact)
+    # YYYY-MM-DDTHH:MM:SS.ffffffZ (exact)
+    if exact:
+        if len(value) != 27 or value[19] != '.' or value[26] != 'Z':
+            return None
+        microsecond = value[20:26]
+    else:
+        value = value.split('.', 1)[0][0:19]
+        if len(value) != 19:
+            return None
+        microsecond = '0'
+    if (value[4] == '-' and value[7] == '-' and value[10] == 'T'
+            and value[13] == ':' and value[16] == ':'
+            and _is_digits(value[:4] + value[5:7] + value[8:10]
+                           + value[11:13] + value[14:16] + value[17:19]
+                           + microsecond)):
+        try:
+            return datetime.datetime(
+                int(value[:4]), int(value[5:7]), int(value[8:10]),
+                int(value[11:13]), int(value[14:16]), int(value[17:19]),
+                int(microsecond),
+            )
+        except ValueError:
+            pass
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_time(value, exact):
+    # HH:MM:SS, ignoring any fraction (non-exact)
+    # HH:MM:SS.ffffff (exact; the fraction is checked but, as with
+    # time.strptime, not kept)
+    if exact:
+        if len(value) != 15 or value[8] != '.' or not _is_digits(value[9:]):
+            return None
+        value = value[:8]
+    else:
+        value = value.split('.', 1)[0]
+    if (len(value) == 8 and value[2] == ':' and value[5] == ':'
+            and _is_digits(value[:2] + value[3:5] + value[6:])):
+        try:
+            return datetime.time(
+                int(value[:2]), int(value[3:5]), int(value[6:]))
+        except ValueError:
+            pass
+    return None
+
+
 class DateProperty(AbstractDateProperty):
 
     _type = datetime.date
 
     def _wrap(self, value):
+        parsed = _parse_iso_date(value)
+        if parsed is not None:
+            return parsed
         fmt = '%Y-%m-%d'
         try:
             return datetime.date(*time.strptime(value, fmt)[:3])
@@ -81,6 +167,9 @@ class DateTimeProperty(AbstractDateProperty):
     _type = datetime.datetime
 
     def _wrap(self, value):
+        parsed = _parse_iso_datetime(value, self.exact)
+        if parsed is not None:
+            return parsed
         if not self.exact:
             value = value.split('.', 1)[0]  # strip out microseconds
             value = value[0:19]  # remove timezone
@@ -107,6 +196,9 @@ class TimeProperty(AbstractDateProperty):
     _type = datetime.time
 
     def _wrap(self, value):
+        parsed = _parse_iso_time(value, self.exact)
+        if parsed is not None:
+            return parsed
         if not self.exact:
             value = value.split('.', 1)[0]  # strip out microseconds
             fmt = '%H:%M:%S'
@@ -126,27 +218,33 @@ class TimeProperty(AbstractDateProperty):
 class ObjectProperty(JsonProperty):
 
     _type = None
-    default = lambda self: self.item_type()
 
     def __init__(self, item_type=None, **kwargs):
         self._item_type_deferred = item_type
         super(ObjectProperty, self).__init__(**kwargs)
 
+    def default(self):
+        return self.item_type()
+
     @property
     def item_type(self):
         from .base import JsonObjectBase
-        if hasattr(self, '_item_type_deferred'):
-            if inspect.isfunction(self._item_type_deferred):
-                self._item_type = self._item_type_deferred()
-            else:
-                self._item_type = self._item_type_deferred
-            del self._item_type_deferred
-        if not issubclass(self._item_type, JsonObjectBase):
+        try:
+            item_type = self._item_type
+        except AttributeError:
+            item_type = self._item_type_deferred
+            if inspect.isfunction(item_type):
+                item_type = item_type()
+                # replaced rather than deleted, so that threads racing
+                # to resolve it all succeed
+                self._item_type_deferred = item_type
+            item_type = self.__dict__.setdefault('_item_type', item_type)
+        if not issubclass(item_type, JsonObjectBase):
             raise ValueError("item_type {0!r} not a JsonObject subclass".format(
-                self._item_type,
+                item_type,
                 self.type_config.properties,
             ))
-        return self._item_type
+        return item_type
 
     def wrap(self, obj, string_conversions=None):
         return self.item_type.wrap(obj)
@@ -1,4 +1,36 @@
-from jsonobject.exceptions import BadValueError
+import codecs
+from contextvars import ContextVar
+from copy import deepcopy
+import datetime
+import decimal
+import json
+import weakref
+from jsonobject.exceptions import BadValueError, FrozenObjectError
+
+
+# True while wrapping data that is already known to be valid
+# (see JsonObjectBase.wrap's trusted parameter)
+wrapping_trusted = ContextVar('wrapping_trusted', default=False)
+
+# True while wrapping JSON that was parsed or copied for the object being
+# wrapped, so that containers storing their items once can take the place
+# of the lists and dicts in it without changing data the caller holds
+wrapping_owned = ContextVar('wrapping_owned', default=False)
+
+# placeholder in JsonObjectBase._wrapped for values
+# that have not been wrapped yet (see JsonObjectBase._wrap_lazily)
+_DEFERRED = object()
+
+
+class _Missing(object):
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        return 'MISSING'
+
+# stands for a key that is absent in get_changes() entries
+MISSING = _Missing()
 
 
 def check_type(obj, item_type, message):
@@ -10,6 +42,325 @@ def check_type(obj, item_type, message):
         return obj
 
 
+_JSON_SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def copy_json(obj):
+    """
+    deep copy a raw JSON value
+
+    Much faster than copy.deepcopy for the dicts, lists and scalars
+    that make up raw JSON; anything else is handed to copy.deepcopy.
+
+    """
+    if type(obj) in _JSON_SCALAR_TYPES:
+        return obj
+    # subclasses are containers that serve as their own raw values
+    # (see JsonArray), copied as plain dicts and lists
+    elif isinstance(obj, dict):
+        return {key: copy_json(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [copy_json(value) for value in obj]
+    else:
+        return deepcopy(obj)
+
+
+# wrapped values that copies of objects and containers share
+_IMMUTABLE_TYPES = _JSON_SCALAR_TYPES | frozenset([
+    datetime.date, datetime.datetime, datetime.time, decimal.Decimal])
+
+
+def copy_item(parent, wrapped, raw, memo):
+    """
+    copy a wrapped value and its raw value into parent,
+    a copy of the object or container holding them
+
+    With memo None, as for copy.copy, both are shared.  Otherwise, as for
+    copy.deepcopy, objects and containers are copied structurally and their
+    raw values taken from the copies, immutable values are shared,
+    and anything else is deep copied.  Nothing is wrapped or validated again.
+
+    Returns the (wrapped, raw) pair to store in parent.
+
+    """
+    if memo is None or type(wrapped) in _IMMUTABLE_TYPES:
+        new_wrapped = wrapped
+    elif isinstance(wrapped, ChangeTrackingMixin):
+        # skip copy.deepcopy's bookkeeping; __deepcopy__ adds the copy to memo
+        new_wrapped = memo.get(id(wrapped))
+        if new_wrapped is None:
+            new_wrapped = wrapped.__deepcopy__(memo)
+    else:
+        new_wrapped = deepcopy(wrapped, memo)
+    if isinstance(wrapped, ChangeTrackingMixin):
+        parent._attach(new_wrapped)
+        if raw is wrapped._obj:
+            return new_wrapped, new_wrapped._obj
+    elif raw is wrapped:
+        return new_wrapped, new_wrapped
+    if memo is None or type(raw) in _JSON_SCALAR_TYPES:
+        return new_wrapped, raw
+    return new_wrapped, copy_json(raw)
+
+
+class ChangeTrackingMixin(object):
+    """
+    Tracks whether a JsonObject or container, including everything in it,
+    is known to be valid: it has passed validate() and hasn't changed since.
+
+    Each change is propagated up to the objects and containers holding
+    this one, so validating them again only has to descend into the parts
+    that changed since they were last validated.
+
+    Once checkpoint() has been called (see JsonObjectBase.get_changes),
+    changes are also recorded: each object or container keeps
+    the raw values it had before its first change since the checkpoint,
+    and flags itself and the objects and containers holding it as changed,
+    so that collecting the changes only descends into the parts that changed.
+
+    """
+    # True once validate() has passed, until the next change
+    _valid = False
+    # weak references to the objects and containers holding this one
+    _parents = ()
+    # True once changes are recorded, which starts with a checkpoint
+    _tracking = False
+    # True if self or anything in it changed since the last checkpoint
+    _has_changes = False
+    # raw values from before the first change since the last checkpoint:
+    # a dict of key -> value for objects and dicts (MISSING for new keys),
+    # a copy of the whole list for arrays and sets
+    _original = None
+    # True once frozen (see JsonObjectBase.freeze), after which it can't change
+    _frozen = False
+
+    def _attach(self, value):
+        """
+        record self as a parent of value if value is tracked too
+
+        """
+        if isinstance(value, ChangeTrackingMixin):
+            value._add_parent(self)
+            if self._tracking:
+                value._track_changes()
+        return value
+
+    def _add_parent(self, parent):
+        # frozen objects and containers can't change, so they never need
+        # to tell their parents, and are left untouched
+        if not self._frozen:
+            for ref in self._parents:
+                if ref() is parent:
+                    break
+            else:
+                self._parents = tuple(
+                    ref for ref in self._parents if ref() is not None
+                ) + (weakref.ref(parent),)
+        if not self._valid:
+            parent._mark_dirty()
+
+    def _mark_dirty(self):
+        # if self was already dirty, so are its parents
+        if self._valid:
+            self._valid = False
+            for ref in self._parents:
+                parent = ref()
+                if parent is not None:
+                    parent._mark_dirty()
+
+    def _check_not_frozen(self):
+        if self._frozen:
+            raise FrozenObjectError(
+                "can't change a frozen {}".format(type(self).__name__))
+
+    def _record_key_change(self, key, old):
+        """
+        call after changing key, for objects and dicts,
+        with the raw value it had before
+
+        """
+        if self._tracking:
+            original = self._original
+            if original is None:
+                original = self._original = {}
+            if key not in original:
+                original[key] = copy_json(old)
+            self._mark_changed()
+
+    def _before_change(self):
+        """
+        call before changing self, for arrays and sets, and pass what it
+        returns to _record_change once the change has been made
+
+        """
+        self._check_not_frozen()
+        if self._tracking and self._original is None:
+            return copy_json(self._obj)
+        return None
+
+    def _record_change(self, original):
+        if self._tracking:
+            if self._original is None:
+                self._original = original
+            self._mark_changed()
+
+    def _mark_changed(self):
+        # if self was already changed, so are its parents
+        if not self._has_changes:
+            self._has_changes = True
+            for ref in self._parents:
+                parent = ref()
+                if parent is not None and parent._tracking:
+                    parent._mark_changed()
+
+    def _track_changes(self):
+        """
+        start recording changes to self and everything in it
+
+        Frozen objects and containers can't change, so they are left out.
+
+        """
+        if not self._tracking and not self._frozen:
+            self._tracking = True
+            for _, child in self._iter_tracked_children():
+                child._track_changes()
+
+    def _iter_tracked_children(self):
+        raise NotImplementedError()
+
+    def _collect_changes(self, path, changes):
+        """
+        append (path, old, new) for every change under self to changes
+
+        Objects and dicts report each changed key and descend into the rest;
+        arrays and sets report a change to themselves as a whole.
+
+        """
+        original = self._original
+        if isinstance(original, dict):
+            for key, old in original.items():
+                new = self._obj.get(key, MISSING)
+                if new != old:
+                    changes.append((path + (key,), old, copy_json(new)))
+        elif original is not None:
+            if original != self._obj:
+                changes.append((path, original, copy_json(self._obj)))
+            return
+        for key, child in self._iter_tracked_children():
+            if child._has_changes and (original is None or key not in original):
+                child._collect_changes(path + (key,), changes)
+
+    def _freeze(self, by_value=False):
+        """
+        make self and everything in it read-only
+
+        by_value is True when freezing objects as they are wrapped,
+        which are then compared and hashed by their JSON (see JsonObjectBase.wrap).
+
+        """
+        if not self._frozen:
+            # freeze the children first, since freezing objects by value
+            # changes their hash
+            for _, child in self._iter_tracked_children():
+                child._freeze(by_value)
+            self._frozen = True
+            # changes no longer need to be propagated
+            self._parents = ()
+
+    def _clear_changes(self):
+        if self._has_changes:
+            self._has_changes = False
+            self._original = None
+            for _, child in self._iter_tracked_children():
+                child._clear_changes()
+
+
+def iter_json_lines(fp):
+    """
+    yield the JSON value on each non-blank line of a file-like object
+
+    """
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+def iter_json_array(fp, chunk_size=65536):
+    """
+    yield the items of a JSON array read incrementally from a file-like object
+
+    Only the item being decoded (plus at most one chunk) is held in memory.
+    fp may be opened in text or binary mode; bytes are decoded as UTF-8.
+
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = None
+    buf = ''
+    pos = 0
+    eof = False
+
+    def read(size):
+        nonlocal buf, pos, eof, text_decoder
+        chunk = fp.read(size)
+        if not chunk:
+            eof = True
+        if isinstance(chunk, bytes):
+            if text_decoder is None:
+                text_decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = text_decoder.decode(chunk, final=eof)
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            read(chunk_size)
+
+    def expect(chars):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError('Expecting one of {!r} in JSON array, '
+                             'found {!r}'.format(chars, buf[pos:pos + 20]))
+        pos += 1
+        return buf[pos - 1]
+
+    expect('[')
+    skip_whitespace()
+    if buf[pos:pos + 1] == ']':
+        return
+    while True:
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                end = None
+            # a number that runs up to the end of what has been read so far
+            # (or stops short of a '.' or exponent) may continue in the next chunk
+            if end is not None and (
+                    eof or not isinstance(value, (int, float))
+                    or (end < len(buf) and buf[end] not in _NUMBER_CHARS)):
+                break
+            # read at least as much again as is buffered
+            # so that decoding a large item stays linear
+            read(max(chunk_size, len(buf) - pos))
+        pos = end
+        yield value
+        if expect(',]') == ']':
+            return
+
+
 class SimpleDict(dict):
     """
     Re-implements destructive methods of dict
@@ -21,6 +372,10 @@ class SimpleDict(dict):
                 for key, value in dct.items():
                     self[key] = value
 
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
     def clear(self):
         for key in list(self.keys()):
             del self[key]
@@ -20,8 +20,14 @@ extensions = [
 ]
 
 if USE_CYTHON:
+    from Cython import __version__ as cython_version
     from Cython.Build import cythonize
-    extensions = cythonize(extensions, compiler_directives={"language_level" : "3str"})
+    compiler_directives = {"language_level" : "3str"}
+    if tuple(map(int, cython_version.split('.')[:2])) >= (3, 1):
+        # the modules don't rely on the GIL (see "Thread safety" in README.md),
+        # so free-threaded builds of Python needn't enable it to import them
+        compiler_directives["freethreading_compatible"] = True
+    extensions = cythonize(extensions, compiler_directives=compiler_directives)
 else:
     print("You are running without Cython installed. It is highly recommended to run\n"
           "  ./scripts/install_cython.sh\n"
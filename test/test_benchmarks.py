@@ -0,0 +1,20 @@
+import inspect
+from unittest import TestCase
+
+from benchmarks.suites import SUITES
+
+
+class BenchmarksTestCase(TestCase):
+    def test_benchmarks_run(self):
+        # run each benchmark once, on its first fixture or a smaller size,
+        # so that the suites keep working as the library changes
+        for suite in SUITES:
+            param = suite.params[0]
+            if isinstance(param, int):
+                param = min(param, 1000)
+            for method_name, _ in inspect.getmembers(suite, inspect.isfunction):
+                if method_name.startswith('time_'):
+                    with self.subTest(suite=suite.__name__, method=method_name):
+                        instance = suite()
+                        instance.setup(param)
+                        getattr(instance, method_name)(param)
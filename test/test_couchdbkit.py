@@ -1,3 +1,4 @@
+import io
 import json
 import os
 from unittest import TestCase
@@ -6,9 +7,12 @@ from io import open
 
 
 class CouchdbkitTestCase(TestCase):
-    def _test(self, name):
+    def _load(self, name):
         with open(os.path.join('test', 'couchdbkit', 'data', '{0}.json'.format(name))) as f:
-            Application.wrap(json.load(f))
+            return json.load(f)
+
+    def _test(self, name):
+        Application.wrap(self._load(name))
 
     def test_basic(self):
         self._test('basic')
@@ -21,3 +25,12 @@ class CouchdbkitTestCase(TestCase):
 
     def test_multimedia_map(self):
         self._test('multimedia_map')
+
+    def test_iter_wrap(self):
+        docs = [self._load(name) for name in ('basic', 'medium', 'large')]
+        expected = [Application.wrap(doc).to_json() for doc in docs]
+        stream = io.BytesIO(json.dumps(docs).encode('utf-8'))
+        self.assertEqual(
+            [app.to_json() for app in Application.iter_wrap(stream, format='array')],
+            expected,
+        )
@@ -1,7 +1,7 @@
 from decimal import Decimal
 import datetime
 from jsonobject.exceptions import BadValueError
-from jsonobject import JsonObject, ObjectProperty, DateTimeProperty
+from jsonobject import JsonObject, ObjectProperty, DateTimeProperty, DictProperty
 import unittest
 from jsonobject.base import get_settings
 
@@ -85,6 +85,65 @@ class StringConversionsTest(unittest.TestCase):
         self.assertEqual(foo.decimal, Decimal('1.0'))
         self.assertEqual(foo.bar.decimal, '2.4')
 
+    def test_container_without_conversions(self):
+        class Foo(JsonObject):
+            converted = DictProperty()
+            free_text = DictProperty(string_conversions=())
+
+        foo = Foo.wrap({'converted': dict(self.EXAMPLES),
+                        'free_text': dict(self.EXAMPLES)})
+        for key, value in self.EXAMPLES_CONVERTED.items():
+            self.assertEqual(foo.converted[key], value)
+            self.assertEqual(foo.free_text[key], self.EXAMPLES[key])
+        foo.free_text['date'] = '2015-01-01'
+        self.assertEqual(foo.free_text['date'], '2015-01-01')
+
+    def test_nested_container_without_conversions(self):
+        from jsonobject import ListProperty
+
+        class Foo(JsonObject):
+            converted = DictProperty(DictProperty())
+            free_text = DictProperty(DictProperty(string_conversions=()))
+            free_lists = ListProperty(ListProperty(string_conversions=()))
+
+        foo = Foo.wrap({'converted': {'a': {'date': '2014-02-04'}},
+                        'free_text': {'a': {'date': '2014-02-04'}},
+                        'free_lists': [['2014-02-04']]})
+        self.assertEqual(foo.converted['a']['date'], datetime.date(2014, 2, 4))
+        self.assertEqual(foo.free_text['a']['date'], '2014-02-04')
+        self.assertEqual(foo.free_lists[0][0], '2014-02-04')
+
+    def test_custom_conversions(self):
+        import re
+
+        class Foo(JsonObject):
+            class Meta(object):
+                string_conversions = (
+                    (re.compile(r'^\d+e\d+$', re.IGNORECASE), Decimal),
+                    # a backreference keeps this one from being combined
+                    # with the others
+                    (re.compile(r'^(\d)\1\.\d$'), Decimal),
+                )
+
+        foo = Foo.wrap({'a': '1E5', 'b': '2e3', 'c': '33.5', 'd': '34.5', 'e': 'e5'})
+        self.assertEqual(
+            [foo.a, foo.b, foo.c, foo.d, foo.e],
+            [Decimal('1E5'), Decimal('2e3'), Decimal('33.5'), '34.5', 'e5'],
+        )
+
+    def test_conditional_group_reference(self):
+        import re
+        from jsonobject.base import compile_string_conversions
+        # (?(1)...) refers to a group by number, so the pattern
+        # can't be combined with others without changing what it matches
+        convert = compile_string_conversions([
+            (re.compile(r'^(a)?(?(1)b|c)$'), lambda value: 'converted'),
+        ])
+        self.assertEqual(
+            [convert('ab'), convert('c'), convert('ac')],
+            ['converted', 'converted', 'ac'],
+        )
+
     def test_update_properties(self):
         class Foo(JsonObject):
 
@@ -1,10 +1,16 @@
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy as shallow_copy, deepcopy
+import datetime
+import json
+import threading
+import time
 import unittest
 import jsonobject
 from jsonobject import *
 from jsonobject.exceptions import (
     BadValueError,
     DeleteNotAllowed,
+    FrozenObjectError,
     WrappingAttributeError,
 )
 
@@ -155,6 +161,67 @@ class JsonObjectTestCase(unittest.TestCase):
         f2 = FamilyMember.wrap(self._danny_data())
         self.assertEqual(f2.to_json(), pickle.loads(pickle.dumps(f1)).to_json())
 
+    def test_to_json_copy(self):
+        danny = FamilyMember.wrap(self._danny_data())
+        json = danny.to_json()
+        self.assertEqual(json, danny._obj)
+        self.assertIsNot(json, danny._obj)
+        self.assertIsNot(json['brothers'], danny._obj['brothers'])
+        self.assertIsNot(json['brothers'][0], danny._obj['brothers'][0])
+
+    def test_to_json_no_copy(self):
+        danny = FamilyMember.wrap(self._danny_data())
+        json = danny.to_json(copy=False)
+        self.assertIs(json, danny._obj)
+        danny.brothers[0].first_name = 'Alexander'
+        self.assertEqual(json['brothers'][0]['first_name'], 'Alexander')
+
+    def test_to_json_no_validate(self):
+        features = Features.wrap({'hair': 'blue'}, trusted=True)
+        with self.assertRaises(BadValueError):
+            features.to_json()
+        self.assertEqual(features.to_json(validate=False),
+                         {'hair': 'blue', 'eyes': None})
+
+    def test_to_json_string(self):
+        import json
+        import datetime
+        import decimal
+
+        class Foo(JsonObject):
+            date = DateProperty()
+            amount = DecimalProperty()
+            name = StringProperty()
+
+        foo = Foo(date=datetime.date(2024, 2, 29), amount=decimal.Decimal('1.10'),
+                  name='Z\u00fcrich')
+        self.assertEqual(json.loads(foo.to_json_string()), foo.to_json())
+        self.assertEqual(
+            foo.to_json_string(compact=True, sort_keys=True),
+            '{"amount":"1.10","date":"2024-02-29","name":"Z\\u00fcrich"}'
+        )
+        self.assertEqual(foo.to_json_bytes(), foo.to_json_string().encode('utf-8'))
+        with self.assertRaises(BadValueError):
+            Features.wrap({'hair': 'blue'}, trusted=True).to_json_string()
+
+    def test_instance_layout(self):
+        from jsonobject.base import get_dynamic_properties
+
+        class Foo(JsonObject):
+            _allow_dynamic_properties = False
+            a = StringProperty()
+            b = IntegerProperty()
+
+        foo = Foo.wrap({'a': 'x', 'b': 1})
+        # no per-instance state beyond the raw and wrapped values
+        self.assertEqual(set(vars(foo)), {'_obj', '_wrapped', '_valid'})
+        self.assertEqual(get_dynamic_properties(foo), {})
+        bar = JsonObject(a=1)
+        self.assertEqual(set(vars(bar)), {'_obj', '_wrapped', '_valid', 'a'})
+        self.assertEqual(get_dynamic_properties(bar), {'a': 1})
+        del bar.a
+        self.assertEqual(get_dynamic_properties(bar), {})
+
     def test_default(self):
         p = FamilyMember(first_name='PJ')
         self.assertEqual(p.to_json(), {
@@ -430,6 +497,17 @@ class JsonObjectTestCase(unittest.TestCase):
         foo = Foo()
         self.assertIsInstance(foo.bar, Bar)
 
+    def test_wrap_plan(self):
+        # testing an internal assumption; can remove if internals change
+        self.assertEqual(set(JunkAB._wrap_plan), {'a', 'b'})
+        plan = JunkAB._wrap_plan['b']
+        self.assertIs(plan.property, JunkAB.b_property)
+        self.assertEqual(plan.wrap({'c': 1}).c_property, 1)
+        self.assertEqual(set(FamilyMember._wrap_plan),
+                         set(FamilyMember._properties_by_key))
+        self.assertIs(FamilyMember._wrap_plan['first_name'].property,
+                      Person._wrap_plan['first_name'].property)
+
     def test_module_has_jsonobjectmeta(self):
         # regression test
         self.assertIsInstance(jsonobject.JsonObjectMeta, type)
@@ -468,12 +546,129 @@ class TestJsonArray(unittest.TestCase):
         self.assertEqual(value, data)
         self.assertEqual(value._obj, data)
 
+    class Dates(JsonObject):
+        dates = ListProperty(datetime.date)
+
+    def _dates(self, *days):
+        return self.Dates.wrap(
+            {'dates': ['2000-01-%02d' % day for day in days]}).dates
+
+    def assertDays(self, dates, days):
+        self.assertEqual([date.day for date in dates], days)
+        self.assertEqual(dates._obj, ['2000-01-%02d' % day for day in days])
+
+    def test_sort(self):
+        dates = self._dates(3, 1, 2)
+        dates.sort()
+        self.assertDays(dates, [1, 2, 3])
+        dates.sort(reverse=True)
+        self.assertDays(dates, [3, 2, 1])
+        dates.sort(key=lambda date: date.day % 3)
+        self.assertDays(dates, [3, 1, 2])
+        dates.sort(cmp=lambda a, b: (a > b) - (a < b))
+        self.assertDays(dates, [1, 2, 3])
+
+    def test_sort_is_stable(self):
+        dates = self._dates(4, 1, 3, 2)
+        dates.sort(key=lambda date: date.day % 2)
+        self.assertDays(dates, [4, 2, 1, 3])
+        dates.sort(key=lambda date: date.day % 2, reverse=True)
+        self.assertDays(dates, [1, 3, 4, 2])
+
+    def test_slices(self):
+        dates = self._dates(1, 2, 3, 4, 5)
+        dates[1:3] = [datetime.date(2000, 1, 9)] * 3
+        self.assertDays(dates, [1, 9, 9, 9, 4, 5])
+        del dates[-3:]
+        self.assertDays(dates, [1, 9, 9])
+        dates[::2] = [datetime.date(2000, 1, 7), datetime.date(2000, 1, 8)]
+        self.assertDays(dates, [7, 9, 8])
+        with self.assertRaises(ValueError):
+            dates[::2] = []
+        del dates[::2]
+        self.assertDays(dates, [9])
+
+    def test_remove_and_extend(self):
+        dates = self._dates(1, 2, 1)
+        dates.remove(datetime.date(2000, 1, 1))
+        self.assertDays(dates, [2, 1])
+        with self.assertRaises(ValueError):
+            dates.remove(datetime.date(2000, 1, 5))
+        dates.extend(datetime.date(2000, 1, day) for day in (3, 4))
+        dates.extend(iter([]))
+        self.assertDays(dates, [2, 1, 3, 4])
+
     @property
     def type_config(self):
         from jsonobject.base import TypeConfig
         return TypeConfig(JsonObject.Meta.properties)
 
 
+class TestJsonSet(unittest.TestCase):
+
+    class Foo(JsonObject):
+        ids = SetProperty(str)
+        dates = SetProperty(datetime.date)
+
+    def assertConsistent(self, value):
+        self.assertEqual(set(value._obj), value)
+        self.assertEqual(len(value._obj), len(value))
+        self.assertEqual(value._members, value._obj)
+        self.assertEqual(
+            value._index, {member: i for i, member in enumerate(value._members)})
+
+    def test_duplicates_are_dropped(self):
+        foo = self.Foo.wrap({'ids': ['a', 'b', 'a'], 'dates': []})
+        self.assertEqual(foo.ids, {'a', 'b'})
+        self.assertEqual(foo.to_json()['ids'], ['a', 'b'])
+        self.assertConsistent(foo.ids)
+
+    def test_add_remove_pop(self):
+        foo = self.Foo.wrap({'ids': ['a', 'b', 'c', 'd']})
+        foo.ids.add('e')
+        foo.ids.add('a')
+        foo.ids.remove('b')
+        self.assertEqual(foo.to_json()['ids'], ['a', 'e', 'c', 'd'])
+        self.assertEqual(foo.ids.pop(), 'd')
+        foo.ids.discard('x')
+        with self.assertRaises(KeyError):
+            foo.ids.remove('x')
+        self.assertEqual(foo.to_json()['ids'], ['a', 'e', 'c'])
+        self.assertConsistent(foo.ids)
+        foo.ids.clear()
+        self.assertEqual(foo.to_json()['ids'], [])
+        with self.assertRaises(KeyError):
+            foo.ids.pop()
+        self.assertConsistent(foo.ids)
+
+    def test_bulk_operations_keep_order(self):
+        foo = self.Foo.wrap({'ids': ['a', 'b', 'c', 'd', 'e']})
+        foo.ids &= {'a', 'c', 'd', 'e', 'x'}
+        self.assertEqual(foo.to_json()['ids'], ['a', 'c', 'd', 'e'])
+        foo.ids.difference_update(['c'], ['x'])
+        self.assertEqual(foo.to_json()['ids'], ['a', 'd', 'e'])
+        foo.ids ^= {'d', 'f'}
+        self.assertEqual(foo.to_json()['ids'], ['a', 'e', 'f'])
+        foo.ids.intersection_update(['f', 'a'])
+        self.assertEqual(foo.to_json()['ids'], ['a', 'f'])
+        self.assertConsistent(foo.ids)
+
+    def test_wrapped_members(self):
+        foo = self.Foo.wrap({'dates': ['2000-01-01', '2000-01-02']})
+        foo.dates.remove(datetime.date(2000, 1, 1))
+        foo.dates.add(datetime.date(2000, 1, 3))
+        self.assertEqual(foo.to_json()['dates'], ['2000-01-02', '2000-01-03'])
+        foo.dates -= {datetime.date(2000, 1, 2)}
+        self.assertEqual(foo.to_json()['dates'], ['2000-01-03'])
+
+    def test_changes(self):
+        foo = self.Foo.wrap({'ids': ['a', 'b', 'c']})
+        foo.checkpoint()
+        foo.ids -= {'a', 'b'}
+        foo.ids.pop()
+        self.assertEqual(foo.get_changes(), [(('ids',), ['a', 'b', 'c'], [])])
+
+
 class PropertyInsideContainerTest(unittest.TestCase):
 
     def test_default_is_required(self):
@@ -617,6 +812,1104 @@ class LazyValidationTest(unittest.TestCase):
         self._validate_not_raises(foo)
 
 
+class LazyWrapTest(unittest.TestCase):
+
+    def _danny_data(self):
+        return JsonObjectTestCase._danny_data(self)
+
+    def test_subtrees_are_deferred(self):
+        data = self._danny_data()
+        danny = FamilyMember.wrap(data, lazy=True)
+        self.assertEqual(danny.first_name, 'Danny')
+        self.assertIs(danny._wrapped['brothers'], jsonobject.base._DEFERRED)
+        self.assertIs(danny._wrapped['features'], jsonobject.base._DEFERRED)
+        self.assertEqual(danny.brothers[1].full_name, 'Nicky Roberts')
+        self.assertIsInstance(danny._wrapped['brothers'], JsonArray)
+        self.assertIs(danny['features']._obj, data['features'])
+        self.assertEqual(danny.to_json(), data)
+
+    def test_key_order(self):
+        danny = FamilyMember.wrap(self._danny_data(), lazy=True)
+        eager = FamilyMember.wrap(self._danny_data())
+        self.assertEqual(list(danny.keys()), list(eager.keys()))
+        for key, value in danny.items():
+            self.assertIsNot(value, jsonobject.base._DEFERRED)
+
+    def test_mutation(self):
+        danny = FamilyMember.wrap(self._danny_data(), lazy=True)
+        danny.favorite_numbers.append(13)
+        danny.features = Features(hair='grey')
+        self.assertEqual(danny.to_json()['favorite_numbers'],
+                         [1, 1, 2, 3, 5, 8, 13])
+        self.assertEqual(danny.to_json()['features'],
+                         {'hair': 'grey', 'eyes': None})
+
+    def test_validation_is_deferred(self):
+        foo = FeatureMap.wrap({'feature_map': {'lala': 10}}, lazy=True)
+        with self.assertRaises(BadValueError):
+            foo.feature_map
+        foo = FeatureMap.wrap({'feature_map': {'lala': 10}}, lazy=True)
+        with self.assertRaises(BadValueError):
+            foo.validate()
+
+    def test_class_setting(self):
+        class Foo(JsonObject):
+            _wrap_lazily = True
+            features = ObjectProperty(Features)
+
+        foo = Foo.wrap({'features': {'hair': 'brown'}})
+        self.assertIs(foo._wrapped['features'], jsonobject.base._DEFERRED)
+        self.assertEqual(foo.features.hair, 'brown')
+        foo = Foo.wrap({'features': {'hair': 'brown'}}, lazy=False)
+        self.assertIsInstance(foo._wrapped['features'], Features)
+
+
+class TrustedWrapTest(unittest.TestCase):
+
+    def _danny_data(self):
+        return JsonObjectTestCase._danny_data(self)
+
+    def test_wrap(self):
+        data = self._danny_data()
+        danny = FamilyMember.wrap(data, trusted=True)
+        self.assertEqual(danny.brothers[1].full_name, 'Nicky Roberts')
+        self.assertIs(danny.brothers._obj, data['brothers'])
+        self.assertIs(danny.brothers[0]._obj, data['brothers'][0])
+        self.assertIs(danny.features._obj, data['features'])
+        self.assertEqual(danny.to_json(),
+                         FamilyMember.wrap(self._danny_data()).to_json())
+
+    def test_raw_values_are_kept(self):
+        import datetime
+        user = User.wrap({'date_joined': '2013-08-05T02:46:58.123Z'},
+                         trusted=True)
+        self.assertEqual(user.date_joined,
+                         datetime.datetime(2013, 8, 5, 2, 46, 58))
+        self.assertEqual(user._obj['date_joined'], '2013-08-05T02:46:58.123Z')
+        user.date_joined = user.date_joined
+        self.assertEqual(user._obj['date_joined'], '2013-08-05T02:46:58Z')
+
+    def test_validation_is_deferred(self):
+        features = Features.wrap({'hair': 'blue'}, trusted=True)
+        self.assertEqual(features.hair, 'blue')
+        with self.assertRaises(BadValueError):
+            features.validate()
+        with self.assertRaises(BadValueError):
+            features.to_json()
+        with self.assertRaises(BadValueError):
+            FeatureMap.wrap({'feature_map': {'lala': {'hair': 'blue'}}},
+                            trusted=True).to_json()
+
+    def test_type_errors_still_raise(self):
+        with self.assertRaises(BadValueError):
+            FeatureMap.wrap({'feature_map': {'lala': 10}}, trusted=True)
+
+    def test_dynamic_properties(self):
+        import datetime
+        from jsonobject.base import get_dynamic_properties
+        foo = Features.wrap({'date': '2012-01-01', 'tags': ['a']}, trusted=True)
+        self.assertEqual(foo.date, datetime.date(2012, 1, 1))
+        self.assertEqual(foo.tags, ['a'])
+        self.assertEqual(get_dynamic_properties(foo),
+                         {'date': datetime.date(2012, 1, 1), 'tags': ['a']})
+        with self.assertRaises(WrappingAttributeError):
+            Person.wrap({'full_name': 'Danny Roberts'}, trusted=True)
+
+    def test_only_applies_to_the_call(self):
+        Features.wrap({'eyes': 'brown'}, trusted=True)
+        with self.assertRaises(BadValueError):
+            Features.wrap({'hair': 'blue'})
+
+    def test_lazy(self):
+        data = self._danny_data()
+        data['features']['hair'] = 'blue'
+        danny = FamilyMember.wrap(data, lazy=True, trusted=True)
+        self.assertEqual(danny.features.hair, 'blue')
+        self.assertIs(danny.features._obj, data['features'])
+
+
+class WrapJsonTest(unittest.TestCase):
+
+    def test_wrap_json(self):
+        import json
+        data = {'first_name': 'Danny', 'brothers': [{'first_name': 'Alex'}],
+                'features': {'hair': 'brown'}}
+        text = json.dumps(data)
+        for kwargs in ({}, {'trusted': True}, {'lazy': True}):
+            for document in (text, text.encode('utf-8')):
+                danny = FamilyMember.wrap_json(document, **kwargs)
+                self.assertEqual(danny.brothers[0].first_name, 'Alex')
+                self.assertEqual(danny.to_json(),
+                                 FamilyMember.wrap(json.loads(text)).to_json())
+
+    def test_not_a_dict(self):
+        with self.assertRaises(BadValueError):
+            FamilyMember.wrap_json('[]')
+        with self.assertRaises(ValueError):
+            FamilyMember.wrap_json('{')
+
+    def test_wrap_override(self):
+        class Doc(JsonObject):
+            @classmethod
+            def wrap(cls, data):
+                data.pop('doc_type', None)
+                return super(Doc, cls).wrap(data)
+
+        doc = Doc.wrap_json('{"doc_type": "Doc", "a": 1}')
+        self.assertEqual(doc.to_json(), {'a': 1})
+
+
+class IterWrapTest(unittest.TestCase):
+
+    docs = [
+        {'first_name': 'Danny', 'favorite_numbers': [1, 22, 333]},
+        {'first_name': 'Al\u00e9x', 'tags': ['a, b', '[c]']},
+        {'first_name': 'Sam', 'favorite_numbers': []},
+    ]
+
+    def _assert_wrapped(self, people):
+        people = list(people)
+        self.assertEqual([type(person) for person in people], [Person] * 3)
+        self.assertEqual([person.first_name for person in people],
+                         ['Danny', 'Al\u00e9x', 'Sam'])
+        self.assertEqual(people[0].favorite_numbers, [1, 22, 333])
+
+    def test_jsonl(self):
+        import io
+        import json
+        text = '\n'.join(json.dumps(doc) for doc in self.docs) + '\n\n'
+        self._assert_wrapped(Person.iter_wrap(io.StringIO(text)))
+        self._assert_wrapped(Person.iter_wrap(io.BytesIO(text.encode('utf-8'))))
+
+    def test_array(self):
+        import io
+        import json
+        from jsonobject.utils import iter_json_array
+        text = json.dumps(self.docs, ensure_ascii=False, indent=2)
+        self._assert_wrapped(Person.iter_wrap(io.StringIO(text), format='array'))
+        # decode across every possible chunk boundary
+        for chunk_size in (1, 2, 3, 7):
+            self.assertEqual(
+                list(iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size)),
+                self.docs)
+            self.assertEqual(
+                list(iter_json_array(io.StringIO(' [12345, 6.5e3 ] '), chunk_size)),
+                [12345, 6500.0])
+        self.assertEqual(list(iter_json_array(io.StringIO('[ ]'))), [])
+
+    def test_invalid(self):
+        import io
+        from jsonobject.utils import iter_json_array
+        for text in ('{}', '[1 2]', '[1,', '[{"a": 1]'):
+            with self.assertRaises(ValueError):
+                list(iter_json_array(io.StringIO(text), 2))
+        with self.assertRaises(ValueError):
+            Person.iter_wrap(io.StringIO('[]'), format='xml')
+
+    def test_wrap_override(self):
+        import io
+
+        class Doc(JsonObject):
+            @classmethod
+            def wrap(cls, data):
+                data.pop('doc_type', None)
+                return super(Doc, cls).wrap(data)
+
+        [doc] = Doc.iter_wrap(io.StringIO('{"doc_type": "Doc", "a": 1}'))
+        self.assertEqual(doc.to_json(), {'a': 1})
+        with self.assertRaises(TypeError):
+            list(Doc.iter_wrap(io.StringIO('{"a": 1}'), trusted=True))
+
+
+class WrapManyTest(unittest.TestCase):
+
+    def _docs(self):
+        return [
+            {'first_name': 'Person {}'.format(i),
+             'brothers': [{'first_name': 'Brother {}'.format(i)}]}
+            for i in range(25)
+        ]
+
+    def test_wrap_many(self):
+        for workers in (None, 3):
+            people = FamilyMember.wrap_many(self._docs(), workers=workers,
+                                            chunk_size=4)
+            self.assertEqual([person.brothers[0].first_name for person in people],
+                             ['Brother {}'.format(i) for i in range(25)])
+
+    def test_errors(self):
+        docs = self._docs()
+        docs[3]['first_name'] = 3
+        docs[10]['brothers'] = 'Alex'
+        for workers in (None, 3):
+            people = FamilyMember.wrap_many(iter(deepcopy(docs)), workers=workers,
+                                            chunk_size=4, trusted=True)
+            self.assertEqual(len(people), 25)
+            self.assertIsInstance(people[3], BadValueError)
+            self.assertIsInstance(people[10], BadValueError)
+            self.assertEqual(people[11].first_name, 'Person 11')
+
+    def test_wrap_override(self):
+        class Doc(JsonObject):
+            @classmethod
+            def wrap(cls, data):
+                data.pop('doc_type', None)
+                return super(Doc, cls).wrap(data)
+
+        docs = Doc.wrap_many([{'doc_type': 'Doc', 'a': i} for i in range(3)])
+        self.assertEqual([doc.to_json() for doc in docs],
+                         [{'a': 0}, {'a': 1}, {'a': 2}])
+
+
+class ThreadSafetyTest(unittest.TestCase):
+
+    def _wrap_concurrently(self, wrap, threads=8):
+        barrier = threading.Barrier(threads)
+
+        def run(i):
+            barrier.wait()
+            return wrap(i)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(run, range(threads)))
+
+    def test_deferred_item_types(self):
+        class Item(JsonObject):
+            name = StringProperty()
+
+        def item_type():
+            # let the other threads start resolving it too
+            time.sleep(0.01)
+            return Item
+
+        class Foo(JsonObject):
+            items = ListProperty(item_type)
+            item = ObjectProperty(item_type)
+            matrix = ListProperty(ListProperty(item_type))
+
+        foos = self._wrap_concurrently(lambda i: Foo.wrap({
+            'items': [{'name': str(i)}],
+            'item': {'name': str(i)},
+            'matrix': [[{'name': str(i)}]],
+        }))
+        self.assertEqual([foo.matrix[0][0].name for foo in foos],
+                         [str(i) for i in range(8)])
+        self.assertEqual(len({id(foo.items._wrapper) for foo in foos}), 1)
+        self.assertIs(Foo.item.item_type, Item)
+
+    def test_dynamic_property_types(self):
+        class Foo(JsonObject):
+            class Meta(object):
+                update_properties = {}
+
+        foos = self._wrap_concurrently(lambda i: Foo.wrap({
+            'values': [i], 'mapping': {'a': [i]}}))
+        self.assertEqual([foo.mapping['a'][0] for foo in foos], list(range(8)))
+
+
+class PickleTest(unittest.TestCase):
+
+    class Item(JsonObject):
+        name = StringProperty()
+        when = DateProperty()
+
+    class Foo(JsonObject):
+        items = ListProperty(lambda: PickleTest.Item)
+        tags = ListProperty(str)
+        dates = DictProperty(datetime.date)
+        ids = SetProperty(int)
+        item = ObjectProperty(lambda: PickleTest.Item)
+
+    def _data(self):
+        return {
+            'items': [{'name': 'a', 'when': '2000-01-01'}],
+            'tags': ['x', 'y'],
+            'dates': {'a': '2000-01-02'},
+            'ids': [1, 2],
+            'item': {'name': 'b', 'when': None},
+            'extra': {'nested': [1]},
+        }
+
+    def test_round_trip(self):
+        import pickle
+        foo = self.Foo.wrap(self._data())
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(foo, protocol))
+            self.assertEqual(copy.to_json(), foo.to_json())
+            self.assertEqual(copy.items[0].when, datetime.date(2000, 1, 1))
+            self.assertEqual(copy.extra, {'nested': [1]})
+            copy.tags.append('z')
+            self.assertEqual(copy.to_json()['tags'], ['x', 'y', 'z'])
+            self.assertEqual(foo.tags, ['x', 'y'])
+
+    def test_restored_without_rewrapping(self):
+        import pickle
+        foo = self.Foo.wrap(self._data())
+        data = pickle.dumps(foo)
+        # pickles hold the JSON, not the wrapped values or properties
+        self.assertNotIn(b'datetime', data)
+        self.assertNotIn(b'Property', data)
+        copy = pickle.loads(data)
+        # everything is wrapped, so that reading it changes nothing,
+        # but without being validated again
+        self.assertTrue(copy._trusted)
+        self.assertNotIn(jsonobject.utils._DEFERRED, copy._wrapped.values())
+        self.assertFalse(copy._valid)
+
+    def test_containers(self):
+        import pickle
+        foo = self.Foo.wrap(self._data())
+        for container in (foo.items, foo.tags, foo.dates, foo.ids,
+                          JsonArray([1, 'a'], wrapper=None,
+                                    type_config=foo.tags._type_config)):
+            copy = pickle.loads(pickle.dumps(container))
+            self.assertIs(type(copy), type(container))
+            self.assertEqual(copy._obj, container._obj)
+        dates = pickle.loads(pickle.dumps(foo.dates))
+        dates['b'] = datetime.date(2000, 1, 3)
+        self.assertEqual(dates._obj, {'a': '2000-01-02', 'b': '2000-01-03'})
+
+    def test_custom_getstate(self):
+        import pickle
+
+        class Custom(JsonObject):
+            name = StringProperty()
+
+            def __getstate__(self):
+                return {'name': self.name.upper()}
+
+        globals()['Custom'] = Custom
+        Custom.__qualname__ = 'Custom'
+        try:
+            self.assertEqual(
+                pickle.loads(pickle.dumps(Custom(name='a'))).name, 'A')
+        finally:
+            del globals()['Custom']
+
+    def test_custom_reduce(self):
+        import pickle
+
+        class Custom(JsonObject):
+            name = StringProperty()
+
+            def __reduce__(self):
+                return Custom, (), {'name': self.name.upper()}
+
+        globals()['Custom'] = Custom
+        Custom.__qualname__ = 'Custom'
+        try:
+            self.assertEqual(
+                pickle.loads(pickle.dumps(Custom(name='a'))).name, 'A')
+        finally:
+            del globals()['Custom']
+
+
+class CopyTest(unittest.TestCase):
+
+    class Item(JsonObject):
+        name = StringProperty()
+        when = DateProperty()
+
+    class Foo(JsonObject):
+        items = ListProperty(lambda: CopyTest.Item)
+        tags = ListProperty(str)
+        dates = DictProperty(datetime.date)
+        ids = SetProperty(int)
+        item = ObjectProperty(lambda: CopyTest.Item)
+        note = StringProperty(exclude_if_none=True)
+
+    def _foo(self, **kwargs):
+        return self.Foo.wrap({
+            'items': [{'name': 'a', 'when': '2000-01-01'}],
+            'tags': ['x', 'y'],
+            'dates': {'a': '2000-01-02'},
+            'ids': [1, 2],
+            'item': {'name': 'b', 'when': None},
+            'extra': {'nested': [1]},
+        }, **kwargs)
+
+    def test_deepcopy(self):
+        foo = self._foo()
+        foo.validate()
+        copy = deepcopy(foo)
+        self.assertEqual(copy.to_json(), foo.to_json())
+        self.assertTrue(copy._valid)
+        self.assertEqual(copy.get_changes(), [])
+        for name in ('items', 'tags', 'dates', 'ids', 'item', 'extra'):
+            self.assertIsNot(copy[name], foo[name])
+            self.assertIs(copy._obj[name], copy[name]._obj)
+        self.assertIsNot(copy.items[0], foo.items[0])
+        # immutable values are shared rather than copied or wrapped again
+        self.assertIs(copy.items[0].when, foo.items[0].when)
+        self.assertIs(copy.dates['a'], foo.dates['a'])
+
+    def test_deepcopy_is_independent(self):
+        foo = self._foo()
+        copy = deepcopy(foo)
+        copy.checkpoint()
+        copy.items[0].name = 'c'
+        copy.tags.append('z')
+        copy.dates['b'] = datetime.date(2000, 1, 3)
+        copy.ids.add(3)
+        copy.extra['nested'].append(2)
+        copy.note = 'note'
+        self.assertEqual(copy.to_json(), {
+            'items': [{'name': 'c', 'when': '2000-01-01'}],
+            'tags': ['x', 'y', 'z'],
+            'dates': {'a': '2000-01-02', 'b': '2000-01-03'},
+            'ids': [1, 2, 3],
+            'item': {'name': 'b', 'when': None},
+            'extra': {'nested': [1, 2]},
+            'note': 'note',
+        })
+        self.assertEqual(foo.to_json(), self._foo().to_json())
+        self.assertEqual({path for path, _, _ in copy.get_changes()}, {
+            ('items', 0, 'name'), ('tags',), ('dates', 'b'), ('ids',),
+            ('extra', 'nested'), ('note',),
+        })
+        self.assertEqual(foo.get_changes(), [])
+        with self.assertRaises(BadValueError):
+            copy.items[0].when = 'not a date'
+
+    def test_deepcopy_changes_are_revalidated(self):
+        foo = self._foo()
+        foo.validate()
+        copy = deepcopy(foo)
+        copy.items[0].name = 'c'
+        # the change is propagated to the copies holding it
+        self.assertFalse(copy.items._valid)
+        self.assertFalse(copy._valid)
+        self.assertTrue(foo._valid)
+
+    def test_deepcopy_lazy(self):
+        foo = self._foo(lazy=True)
+        copy = deepcopy(foo)
+        self.assertIs(copy._wrapped['items'], jsonobject.utils._DEFERRED)
+        self.assertIsNot(copy._obj['items'], foo._obj['items'])
+        self.assertEqual(copy.items[0].when, datetime.date(2000, 1, 1))
+        self.assertEqual(copy.to_json(), foo.to_json())
+
+    def test_copy(self):
+        for kwargs in ({}, {'lazy': True}, {'frozen': True}):
+            foo = self._foo(**kwargs)
+            copy = shallow_copy(foo)
+            self.assertEqual(copy.to_json(), foo.to_json())
+            # like a deep copy, the copy is independent of the original
+            self.assertIsNot(copy.items, foo.items)
+            self.assertIsNot(copy._obj['items'], foo._obj['items'])
+            copy.tags.append('z')
+            copy.items[0].name = 'c'
+            self.assertEqual(foo.to_json(), self._foo().to_json())
+
+    def test_containers(self):
+        foo = self._foo()
+        for container in (foo.items, foo.tags, foo.dates, foo.ids, foo.extra):
+            for copy in (shallow_copy(container), deepcopy(container)):
+                self.assertIs(type(copy), type(container))
+                self.assertIsNot(copy, container)
+                self.assertEqual(copy._obj, container._obj)
+        items = deepcopy(foo.items)
+        items.append(self.Item(name='c'))
+        self.assertEqual(len(foo.items), 1)
+        self.assertEqual(items._obj[1], {'name': 'c', 'when': None})
+        ids = deepcopy(foo.ids)
+        ids.remove(1)
+        self.assertEqual((ids, ids._obj), ({2}, [2]))
+        self.assertEqual(foo.ids, {1, 2})
+
+
+class FrozenTest(unittest.TestCase):
+
+    class Item(JsonObject):
+        name = StringProperty()
+
+    class Foo(JsonObject):
+        name = StringProperty()
+        items = ListProperty(lambda: FrozenTest.Item)
+        tags = ListProperty(str)
+        counts = DictProperty(int)
+        ids = SetProperty(int)
+        item = ObjectProperty(lambda: FrozenTest.Item)
+        members = SetProperty(lambda: FrozenTest.Item)
+
+    def _data(self):
+        return {
+            'name': 'foo',
+            'items': [{'name': 'a'}],
+            'tags': ['x'],
+            'counts': {'a': 1},
+            'ids': [1],
+            'item': {'name': 'b'},
+            'members': [{'name': 'c'}, {'name': 'd'}],
+            'extra': {'nested': [1]},
+        }
+
+    def test_changes_are_refused(self):
+        foo = self.Foo.wrap(self._data(), frozen=True)
+        changes = [
+            lambda: setattr(foo, 'name', 'bar'),
+            lambda: setattr(foo, 'name', foo.name),
+            lambda: setattr(foo, 'other', 1),
+            lambda: delattr(foo, 'extra'),
+            lambda: setattr(foo.item, 'name', 'c'),
+            lambda: setattr(foo.items[0], 'name', 'c'),
+            lambda: foo.items.append(self.Item()),
+            lambda: foo.items.__setitem__(0, self.Item()),
+            lambda: foo.tags.extend(['y']),
+            lambda: foo.tags.sort(),
+            lambda: foo.tags.pop(),
+            lambda: foo.counts.__setitem__('b', 2),
+            lambda: foo.counts.clear(),
+            lambda: foo.ids.add(2),
+            lambda: foo.ids.remove(1),
+            lambda: foo.extra['nested'].append(2),
+            lambda: foo.tags.clear(),
+            lambda: foo.items.clear(),
+            lambda: foo.tags.__imul__(2),
+            lambda: foo.tags.__iadd__(['y']),
+            lambda: foo.counts.__ior__({'b': 2}),
+            lambda: foo.counts.update({'b': 2}),
+            lambda: foo.counts.setdefault('b', 2),
+            lambda: foo.counts.popitem(),
+            lambda: foo.ids.__ior__({2}),
+            lambda: foo.ids.clear(),
+        ]
+        for change in changes:
+            with self.assertRaises(FrozenObjectError):
+                change()
+        self.assertEqual(foo.to_json(), self._data())
+        self.assertEqual(foo.get_changes(), [])
+        self.assertTrue(foo._valid)
+
+    def test_freeze(self):
+        foo = self.Foo.wrap(self._data(), lazy=True, trusted=True)
+        self.assertIs(foo.freeze(), foo)
+        self.assertNotIn(jsonobject.utils._DEFERRED, foo._wrapped.values())
+        with self.assertRaises(FrozenObjectError):
+            foo.name = 'bar'
+        invalid = self.Foo.wrap({'tags': ['x', None]}, trusted=True)
+        with self.assertRaises(BadValueError):
+            invalid.freeze()
+
+    def test_equality_and_hash(self):
+        foo1 = self.Foo.wrap(self._data(), frozen=True)
+        foo2 = self.Foo.wrap(self._data(), frozen=True)
+        self.assertEqual(foo1, foo2)
+        self.assertEqual(hash(foo1), hash(foo2))
+        self.assertEqual(len({foo1, foo2}), 1)
+        self.assertEqual(hash(foo1.tags), hash(foo2.tags))
+        self.assertEqual(hash(foo1.counts), hash(foo2.counts))
+        self.assertEqual(hash(foo1.members), hash(foo2.members))
+        # members are indexed by their new hashes
+        self.assertIn(self.Item.wrap({'name': 'c'}, frozen=True), foo1.members)
+
+        unfrozen = self.Foo.wrap(self._data())
+        self.assertNotEqual(foo1, unfrozen)
+        self.assertEqual(unfrozen, unfrozen)
+        self.assertEqual(len({unfrozen, self.Foo.wrap(self._data())}), 2)
+        with self.assertRaises(TypeError):
+            hash(unfrozen.tags)
+
+    def test_set_members_with_the_same_json(self):
+        data = dict(self._data(), members=[{'name': 'c'}, {'name': 'c'}])
+        foo = self.Foo.wrap(data)
+        self.assertEqual(len(foo.members), 2)
+        foo.freeze()
+        self.assertEqual(len(foo.members), 2)
+        self.assertEqual(foo.to_json()['members'], [{'name': 'c'}, {'name': 'c'}])
+        with self.assertRaises(BadValueError):
+            self.Foo.wrap(data, frozen=True)
+
+    def test_freeze_keeps_identity(self):
+        import pickle
+        foo = self.Foo.wrap(self._data())
+        foos = {foo}
+        self.assertIs(foo.freeze(), foo)
+        self.assertIn(foo, foos)
+        self.assertEqual(hash(foo), object.__hash__(foo))
+        self.assertNotEqual(foo, self.Foo.wrap(self._data()).freeze())
+        self.assertEqual(hash(foo.tags), hash(('x',)))
+        pickled = pickle.loads(pickle.dumps(foo))
+        self.assertTrue(pickled._frozen)
+        self.assertNotEqual(pickled, foo)
+
+    def test_equal_values_written_differently(self):
+        # equal objects must hash the same, so values that are equal
+        # in Python but written differently in JSON aren't equal
+        for a, b in ((1, 1.0), (1, True)):
+            foo1 = JsonObject.wrap({'a': a}, frozen=True)
+            foo2 = JsonObject.wrap({'a': b}, frozen=True)
+            self.assertNotEqual(foo1, foo2)
+            self.assertEqual(len({foo1, foo2}), 2)
+
+    def test_shared_without_being_changed(self):
+        item = self.Item.wrap({'name': 'a'}, frozen=True)
+        foo = self.Foo(item=item, items=[item])
+        self.assertIs(foo.item, item)
+        self.assertEqual(item._parents, ())
+
+    def test_json_text_is_cached(self):
+        foo = self.Foo.wrap(self._data(), frozen=True)
+        text = foo.to_json_string(sort_keys=True)
+        self.assertIs(foo.to_json_string(sort_keys=True), text)
+        self.assertEqual(json.loads(text), self._data())
+        self.assertIsNot(foo.to_json_string(), text)
+        self.assertEqual(foo.to_json_bytes(sort_keys=True), text.encode('utf-8'))
+
+    def test_copies_are_not_frozen(self):
+        import pickle
+        foo = self.Foo.wrap(self._data(), frozen=True)
+        foo.to_json_string()
+        for copy in (deepcopy(foo), shallow_copy(foo)):
+            self.assertFalse(copy._frozen)
+            copy.name = 'bar'
+            self.assertEqual(copy.to_json_string(compact=True, sort_keys=True),
+                             json.dumps(dict(self._data(), name='bar'),
+                                        separators=(',', ':'), sort_keys=True))
+        copy = deepcopy(foo)
+        copy.items.append(self.Item(name='z'))
+        self.assertEqual(len(foo.items), 1)
+        pickled = pickle.loads(pickle.dumps(foo))
+        self.assertTrue(pickled._frozen)
+        self.assertEqual(pickled, foo)
+
+
+class SingleStorageTest(unittest.TestCase):
+
+    class Foo(JsonObject):
+        tags = ListProperty(str)
+        counts = DictProperty(int)
+        floats = ListProperty(float)
+        matrix = ListProperty(ListProperty(str))
+
+    def _data(self):
+        return {'tags': ['b', 'a'], 'counts': {'a': 1}, 'floats': [1],
+                'matrix': [['x'], ['y', 'z']]}
+
+    def test_items_are_stored_once(self):
+        for kwargs in ({}, {'trusted': True}, {'lazy': True}):
+            # the parsed JSON belongs to the object
+            foo = self.Foo.wrap_json(json.dumps(self._data()), **kwargs)
+            foo.validate()  # wrap any deferred values
+            self.assertIs(foo.tags._obj, foo.tags)
+            self.assertIs(foo._obj['tags'], foo.tags)
+            self.assertIs(foo._obj['counts'], foo.counts)
+            self.assertIs(foo.matrix._obj[1], foo.matrix[1])
+            # floats wrap ints as floats, so the raw ints are kept apart
+            self.assertIsNot(foo.floats._obj, foo.floats)
+            self.assertEqual(foo.to_json(), {
+                'tags': ['b', 'a'], 'counts': {'a': 1}, 'floats': [1],
+                'matrix': [['x'], ['y', 'z']],
+            })
+            self.assertIs(type(foo.to_json()['tags']), list)
+            self.assertIs(type(foo.to_json()['counts']), dict)
+
+    def test_pickled(self):
+        import pickle
+        foo = pickle.loads(pickle.dumps(self.Foo.wrap(self._data())))
+        self.assertIs(foo.tags._obj, foo.tags)
+        self.assertIs(foo._obj['tags'], foo.tags)
+
+    def test_callers_data_is_left_in_place(self):
+        data = self._data()
+        tags = data['tags']
+        foo = self.Foo.wrap(data)
+        self.assertIs(foo._obj, data)
+        self.assertIs(data['tags'], tags)
+        self.assertIs(foo.tags._obj, tags)
+        self.assertIs(type(data['matrix'][0]), list)
+        foo.tags.append('c')
+        self.assertEqual(tags, ['b', 'a', 'c'])
+
+    def test_wrapped_twice(self):
+        data = self._data()
+        first = self.Foo.wrap(data)
+        second = self.Foo.wrap(data)
+        first.tags.append('z')
+        first.matrix[0].append('w')
+        self.assertEqual(first.tags, ['b', 'a', 'z'])
+        self.assertEqual(first.to_json()['tags'], ['b', 'a', 'z'])
+        self.assertEqual(first.to_json()['matrix'], [['x', 'w'], ['y', 'z']])
+        self.assertIs(type(data['tags']), list)
+
+    def test_overridden_wrap(self):
+        class UpperStringProperty(StringProperty):
+            def wrap(self, obj):
+                return obj.upper()
+
+            def unwrap(self, obj):
+                return obj, obj.lower()
+
+        class Foo(JsonObject):
+            tags = ListProperty(UpperStringProperty)
+
+        foo = Foo.wrap({'tags': ['a', 'B']})
+        self.assertEqual(foo.tags, ['A', 'B'])
+        self.assertIsNot(foo.tags._obj, foo.tags)
+        self.assertEqual(foo.to_json(), {'tags': ['a', 'B']})
+        foo.tags.append('C')
+        self.assertEqual(foo.to_json(), {'tags': ['a', 'B', 'c']})
+
+    def test_mutation(self):
+        for foo in (self.Foo.wrap(self._data()),
+                    self.Foo.wrap_json(json.dumps(self._data()))):
+            self._test_mutation(foo)
+
+    def _test_mutation(self, foo):
+        foo.checkpoint()
+        foo.tags.append('c')
+        foo.tags.sort()
+        foo.tags.insert(0, 'z')
+        foo.tags.remove('b')
+        foo.tags.pop()
+        foo.tags.reverse()
+        foo.tags[0] = 'y'
+        foo.counts['b'] = 2
+        del foo.counts['a']
+        foo.matrix[0].append('w')
+        self.assertEqual(foo.to_json(), {
+            'tags': ['y', 'z'], 'counts': {'b': 2}, 'floats': [1],
+            'matrix': [['x', 'w'], ['y', 'z']],
+        })
+        self.assertEqual(len(foo.tags), 2)
+        with self.assertRaises(BadValueError):
+            foo.tags.append(1)
+        self.assertEqual(foo.tags, ['y', 'z'])
+        self.assertEqual(foo.get_patch(), [
+            {'op': 'replace', 'path': '/tags', 'value': ['y', 'z']},
+            {'op': 'add', 'path': '/counts/b', 'value': 2},
+            {'op': 'remove', 'path': '/counts/a'},
+            {'op': 'replace', 'path': '/matrix/0', 'value': ['x', 'w']},
+        ])
+        foo.tags *= 2
+        foo.counts |= {'c': 3}
+        foo.floats.clear()
+        self.assertEqual(foo.to_json(), {
+            'tags': ['y', 'z', 'y', 'z'], 'counts': {'b': 2, 'c': 3},
+            'floats': [], 'matrix': [['x', 'w'], ['y', 'z']],
+        })
+        foo.tags.clear()
+        self.assertEqual(foo.to_json()['tags'], [])
+
+    def test_copy(self):
+        foo = self.Foo.wrap_json(json.dumps(self._data()))
+        for tags in (deepcopy(foo.tags), deepcopy(foo).tags):
+            self.assertEqual(tags, ['b', 'a'])
+            tags.append('c')
+            self.assertEqual(tags._obj, ['b', 'a', 'c'])
+        self.assertEqual(foo.tags, ['b', 'a'])
+
+
+class IncrementalValidationTest(unittest.TestCase):
+
+    def test_only_changed_subtrees_are_revalidated(self):
+        calls = []
+
+        class Leaf(JsonObject):
+            value = IntegerProperty(validators=calls.append)
+
+        class Tree(JsonObject):
+            leaves = ListProperty(Leaf)
+            other = ObjectProperty(Leaf)
+
+        tree = Tree.wrap({
+            'leaves': [{'value': 1}, {'value': 2}],
+            'other': {'value': 3},
+        })
+        del calls[:]
+        tree.validate()
+        tree.to_json()
+        self.assertEqual(calls, [])
+
+        tree.leaves[1].value = 4
+        del calls[:]
+        tree.validate()
+        self.assertEqual(calls, [4])
+        del calls[:]
+        tree.validate()
+        self.assertEqual(calls, [])
+
+        tree.leaves.append(Leaf(value=5))
+        del calls[:]
+        tree.validate()
+        self.assertEqual(calls, [])
+
+    def test_container_change(self):
+        class Foo(JsonObject):
+            numbers = ListProperty(int, required=True)
+            mapping = DictProperty(int, required=True)
+
+        foo = Foo(numbers=[1], mapping={'one': 1})
+        foo.validate()
+        foo.numbers.pop()
+        with self.assertRaises(BadValueError):
+            foo.validate()
+        foo.numbers.append(2)
+        foo.validate()
+        foo.mapping.clear()
+        with self.assertRaises(BadValueError):
+            foo.validate()
+
+    def test_shared_object(self):
+        class Bar(JsonObject):
+            _validate_required_lazily = True
+            string = StringProperty(required=True)
+
+        class Foo(JsonObject):
+            bar = ObjectProperty(Bar)
+
+        bar = Bar(string='hi')
+        foo1 = Foo(bar=bar)
+        foo2 = Foo(bar=bar)
+        foo1.validate()
+        foo2.validate()
+        bar.string = None
+        with self.assertRaises(BadValueError):
+            foo1.validate()
+        with self.assertRaises(BadValueError):
+            foo2.validate()
+
+    def test_trusted_wrap_is_validated_once(self):
+        calls = []
+
+        class Foo(JsonObject):
+            value = IntegerProperty(validators=calls.append)
+
+        foo = Foo.wrap({'value': 1}, trusted=True)
+        self.assertEqual(calls, [])
+        foo.to_json()
+        foo.to_json()
+        self.assertEqual(calls, [1])
+
+    def test_validate_override(self):
+        class Child(JsonObject):
+            a = IntegerProperty()
+
+            def validate(self, required=True):
+                super(Child, self).validate(required=required)
+                if self.a < 0:
+                    raise BadValueError('a must not be negative')
+
+        class Parent(JsonObject):
+            child = ObjectProperty(Child)
+
+        with self.assertRaises(BadValueError):
+            Child.wrap({'a': -1}).to_json()
+        with self.assertRaises(BadValueError):
+            Parent.wrap({'child': {'a': -1}}).to_json()
+        parent = Parent.wrap({'child': {'a': 1}})
+        parent.to_json()
+        parent.child.a = -1
+        with self.assertRaises(BadValueError):
+            parent.to_json()
+
+
+class ValidationPlanTest(unittest.TestCase):
+
+    def test_only_properties_with_checks_are_validated(self):
+        class Checked(StringProperty):
+            def validate(self, value, required=True, recursive=True):
+                super(Checked, self).validate(value, required, recursive)
+
+        class Foo(JsonObject):
+            name = StringProperty()
+            count = IntegerProperty()
+            when = DateProperty()
+            code = StringProperty(choices=['a', 'b'])
+            ref = StringProperty(required=True)
+            size = IntegerProperty(validators=[lambda value: None])
+            checked = Checked()
+            bar = ObjectProperty(lambda: Foo)
+            tags = ListProperty(str)
+
+        self.assertEqual(
+            [key for key, _ in Foo._validation_plan],
+            ['code', 'ref', 'size', 'checked', 'bar', 'tags'],
+        )
+
+    def test_validators(self):
+        calls = []
+
+        class Foo(JsonObject):
+            one = IntegerProperty(validators=calls.append)
+            many = IntegerProperty(validators=[calls.append, calls.append])
+
+        Foo(one=1, many=2).validate()
+        self.assertEqual(calls, [1, 2, 2])
+
+    def test_unhashable_choices(self):
+        class Foo(JsonObject):
+            point = ListProperty(int, choices=[[0, 0], [1, 1]])
+            name = StringProperty(choices=['a', 'b'])
+
+        foo = Foo(point=[1, 1])
+        foo.validate()
+        with self.assertRaises(BadValueError):
+            foo.point = [1, 0]
+        with self.assertRaises(BadValueError):
+            # an unhashable value among hashable choices
+            foo.name = ['a']
+
+    def test_required_items(self):
+        class Foo(JsonObject):
+            strings = ListProperty(str)
+            numbers = DictProperty(int)
+            ids = SetProperty(int)
+
+        Foo.wrap({'strings': ['a'], 'numbers': {'a': 1}, 'ids': [1]},
+                 trusted=True).validate()
+        # trusted wraps leave the items to be checked by validate()
+        for doc in ({'strings': ['a', None]}, {'numbers': {'a': None}},
+                    {'ids': [1, None]}):
+            foo = Foo.wrap(doc, trusted=True)
+            with self.assertRaisesRegex(BadValueError, 'is required'):
+                foo.validate()
+
+
+class ChangeTrackingTest(unittest.TestCase):
+
+    def _wrap(self):
+        danny = FamilyMember.wrap({
+            'first_name': 'Danny',
+            'brothers': [{'first_name': 'Alex'}],
+            'features': {'hair': 'brown', 'eyes': 'blue'},
+        })
+        danny.checkpoint()
+        return danny
+
+    def test_not_tracked_until_checkpoint(self):
+        danny = FamilyMember.wrap({'first_name': 'Danny', 'brothers': []})
+        danny.first_name = 'Dan'
+        danny.brothers.append(FamilyMember(first_name='Sam'))
+        self.assertEqual(danny.get_changes(), [])
+        self.assertIsNone(danny.brothers._original)
+        danny.checkpoint()
+        danny.brothers[0].first_name = 'Samuel'
+        self.assertEqual(danny.get_patch(), [
+            {'op': 'replace', 'path': '/brothers/0/first_name', 'value': 'Samuel'},
+        ])
+
+    def test_no_changes(self):
+        danny = self._wrap()
+        self.assertEqual(danny.get_changes(), [])
+        self.assertEqual(danny.get_patch(), [])
+        danny.first_name = 'Danny'
+        self.assertEqual(danny.get_patch(), [])
+
+    def test_changes(self):
+        danny = self._wrap()
+        danny.first_name = 'Daniel'
+        danny.first_name = 'Dan'
+        danny.features.eyes = 'brown'
+        danny.brothers[0].first_name = 'Alexander'
+        danny.pet = 'cat'
+        self.assertEqual(sorted(danny.get_changes()), [
+            (('brothers', 0, 'first_name'), 'Alex', 'Alexander'),
+            (('features', 'eyes'), 'blue', 'brown'),
+            (('first_name',), 'Danny', 'Dan'),
+            (('pet',), jsonobject.MISSING, 'cat'),
+        ])
+        del danny.pet
+        self.assertEqual(sorted(danny.get_patch(), key=lambda op: op['path']), [
+            {'op': 'replace', 'path': '/brothers/0/first_name', 'value': 'Alexander'},
+            {'op': 'replace', 'path': '/features/eyes', 'value': 'brown'},
+            {'op': 'replace', 'path': '/first_name', 'value': 'Dan'},
+        ])
+
+    def test_containers(self):
+        danny = self._wrap()
+        danny.brothers.append(FamilyMember(first_name='Sam'))
+        danny.brothers[1].first_name = 'Samuel'
+        danny.brothers[0].first_name = 'Alexander'
+        [(path, old, new)] = danny.get_changes()
+        self.assertEqual(path, ('brothers',))
+        self.assertEqual([brother['first_name'] for brother in old], ['Alex'])
+        self.assertEqual(new, danny.to_json()['brothers'])
+
+    def test_replaced_subtree(self):
+        danny = self._wrap()
+        danny.features = Features(hair='grey')
+        danny.features.eyes = 'green'
+        self.assertEqual(danny.get_patch(), [{
+            'op': 'replace', 'path': '/features',
+            'value': {'hair': 'grey', 'eyes': 'green'},
+        }])
+
+    def test_failed_changes(self):
+        class Foo(JsonObject):
+            tags = ListProperty(str)
+            ids = SetProperty(int)
+            mapping = DictProperty(int)
+
+        foo = Foo(tags=['a'], ids={1}, mapping={'a': 1})
+        foo.checkpoint()
+        with self.assertRaises(BadValueError):
+            foo.tags.append(1)
+        with self.assertRaises(IndexError):
+            foo.tags.pop(5)
+        with self.assertRaises(BadValueError):
+            foo.ids.add('x')
+        with self.assertRaises(KeyError):
+            foo.ids.remove(2)
+        with self.assertRaises(BadValueError):
+            foo.mapping['b'] = 'x'
+        with self.assertRaises(KeyError):
+            del foo.mapping['b']
+        with self.assertRaises(BadValueError):
+            foo.tags = 'a'
+        foo.tags.append('b')
+        foo.tags.pop()
+        self.assertEqual(foo.get_changes(), [])
+        self.assertEqual(foo.get_patch(), [])
+
+    def test_set_of_objects(self):
+        class Foo(JsonObject):
+            features = SetProperty(Features)
+
+        foo = Foo.wrap({'features': [{'hair': 'brown'}, {'hair': 'grey'}]})
+        foo.checkpoint()
+        [brown] = [f for f in foo.features if f.hair == 'brown']
+        brown.eyes = 'blue'
+        self.assertEqual(foo.get_changes(), [(
+            ('features',),
+            [{'hair': 'brown', 'eyes': None}, {'hair': 'grey', 'eyes': None}],
+            [{'hair': 'brown', 'eyes': 'blue'}, {'hair': 'grey', 'eyes': None}],
+        )])
+
+    def test_checkpoint(self):
+        danny = self._wrap()
+        danny.features.eyes = 'brown'
+        danny.checkpoint()
+        self.assertEqual(danny.get_changes(), [])
+        danny.features.hair = 'grey'
+        self.assertEqual(danny.get_patch(), [
+            {'op': 'replace', 'path': '/features/hair', 'value': 'grey'},
+        ])
+
+    def test_construction_is_not_a_change(self):
+        class Foo(JsonObject):
+            numbers = ListProperty(int)
+            mapping = DictProperty(int)
+
+        foo = Foo(numbers=[1])
+        foo.checkpoint()
+        self.assertEqual(foo.get_changes(), [])
+        foo.numbers.append(2)
+        foo.mapping['two'] = 2
+        self.assertEqual(sorted(foo.get_patch(), key=lambda op: op['path']), [
+            {'op': 'add', 'path': '/mapping/two', 'value': 2},
+            {'op': 'replace', 'path': '/numbers', 'value': [1, 2]},
+        ])
+
+    def test_pointer_escaping(self):
+        foo = JsonObject(_obj={'a/b': {'c~d': 1}})
+        foo.checkpoint()
+        foo['a/b']['c~d'] = 2
+        self.assertEqual(foo.get_patch(), [
+            {'op': 'replace', 'path': '/a~1b/c~0d', 'value': 2},
+        ])
+
+
 class PropertyTestCase(unittest.TestCase):
     def test_date(self):
         import datetime
@@ -653,6 +1946,30 @@ class PropertyTestCase(unittest.TestCase):
         with self.assertRaises(BadValueError):
             p.wrap('1988-07-07')
 
+    def test_non_canonical_dates(self):
+        # formats outside the fast path are still parsed by strptime
+        import datetime
+        self.assertEqual(DateProperty().wrap('1988-7-7'), datetime.date(1988, 7, 7))
+        self.assertEqual(DateTimeProperty().wrap('2011-01-18t12:38:09.123+05:00'),
+                         datetime.datetime(2011, 1, 18, 12, 38, 9))
+        self.assertEqual(DateTimeProperty(exact=True).wrap('2011-01-18T12:38:09.5Z'),
+                         datetime.datetime(2011, 1, 18, 12, 38, 9, 500000))
+        self.assertEqual(TimeProperty(exact=True).wrap('12:38:09.5'),
+                         datetime.time(12, 38, 9))
+
+    def test_date_error_messages(self):
+        for property_, string, message in [
+            (DateProperty(), '2023-02-29',
+             "'2023-02-29' is not a date-formatted string"),
+            (DateTimeProperty(), '2011-01-18T24:00:00Z',
+             "'2011-01-18T24:00:00Z' is not a datetime-formatted string"),
+            (TimeProperty(), '12:38:60',
+             "'12:38:60' is not a time-formatted string"),
+        ]:
+            with self.assertRaises(BadValueError) as cm:
+                property_.wrap(string)
+            self.assertEqual(str(cm.exception), message)
+
     def test_decimal(self):
         import decimal
 
@@ -675,6 +1992,22 @@ class PropertyTestCase(unittest.TestCase):
         self.assertEqual(foo.decimal, decimal.Decimal('5.25'))
         self.assertEqual(foo.to_json()['decimal'], '5.25')
 
+    def test_overridden_coercion(self):
+        class StrippedStringProperty(StringProperty):
+            def selective_coerce(self, obj):
+                if isinstance(obj, str):
+                    obj = obj.strip()
+                return obj
+
+        class Foo(JsonObject):
+            string = StrippedStringProperty()
+
+        self.assertEqual(Foo.wrap({'string': ' hi '}).string, 'hi')
+        foo = Foo()
+        foo.string = ' bye '
+        self.assertEqual(foo.string, 'bye')
+        self.assertEqual(foo.to_json(), {'string': 'bye'})
+
     def test_dict(self):
         mapping = {'one': 1, 'two': 2}
         o = ObjectWithDictProperty(mapping=mapping)
@@ -874,6 +2207,79 @@ class DynamicConversionTestCase(unittest.TestCase):
         foo.my_list = list(foo.my_list)
         self.assertEqual(foo.to_json(), {'my_list': ['bar']})
 
+    def test_shared_properties(self):
+        import collections
+        from jsonobject.base_properties import DefaultProperty
+        from jsonobject.base import get_settings
+        type_config = get_settings(JsonObject).type_config
+        default = DefaultProperty(type_config=type_config)
+        self.assertIs(default.value_to_property('a'), default.value_to_property('b'))
+        self.assertIsInstance(default.value_to_property('a'), StringProperty)
+        # subclasses are resolved once too
+        ordered = default.value_to_property(collections.OrderedDict())
+        self.assertIsInstance(ordered, DictProperty)
+        self.assertIs(type_config.property_cache[collections.OrderedDict], ordered)
+        with self.assertRaises(BadValueError):
+            default.value_to_property(object())
+        foo = JsonObject(a=[[1]], b=[{'c': 2}])
+        self.assertIs(foo.a._wrapper, foo.b._wrapper)
+        self.assertIs(foo.a[0]._wrapper, foo.a._wrapper)
+
+
+class ProfileTest(unittest.TestCase):
+
+    class Item(JsonObject):
+        name = StringProperty()
+
+    class Doc(JsonObject):
+        items = ListProperty(lambda: ProfileTest.Item)
+        children = ListProperty(lambda: ProfileTest.Doc)
+
+    def test_profile(self):
+        with jsonobject.profile() as profiler:
+            doc = self.Doc.wrap({
+                'items': [{'name': 'a'}, {'name': 'b'}],
+                'children': [{'items': [], 'children': []}],
+                'when': '2000-01-01',
+                'what': 'something',
+            })
+            doc.to_json()
+        stats = profiler.as_dict()
+        self.assertEqual(stats['Doc']['wrap']['count'], 2)
+        self.assertEqual(stats['Doc']['to_json']['count'], 1)
+        self.assertEqual(stats['Item']['wrap']['count'], 2)
+        self.assertEqual(stats['Item.name']['wrap']['count'], 2)
+        self.assertEqual(stats['Doc.items']['wrap']['count'], 2)
+        self.assertEqual(stats['Doc.*']['wrap']['count'], 2)
+        self.assertEqual(stats['DefaultProperty[str]']['wrap']['count'], 2)
+        self.assertEqual(stats['(string conversions)']['attempt']['count'], 2)
+        self.assertEqual(stats['(string conversions)']['converted']['count'], 1)
+        # time spent in a recursive call is only counted once
+        self.assertLessEqual(stats['Doc']['wrap']['time'],
+                             stats['Doc.children']['wrap']['time']
+                             + stats['Doc.items']['wrap']['time']
+                             + stats['Doc.*']['wrap']['time'] + 1)
+        report = profiler.report(limit=3)
+        self.assertEqual(len(report.splitlines()), 4)
+        self.assertIn('Doc', report)
+
+    def test_profiling_stops(self):
+        original_plan = self.Doc._wrap_plan
+        with jsonobject.profile() as profiler:
+            self.assertIsNot(self.Doc._wrap_plan, original_plan)
+            with self.assertRaises(RuntimeError):
+                jsonobject.profile().start()
+
+            class Late(JsonObject):
+                name = StringProperty()
+            Late.wrap({'name': 'late'})
+        self.assertIs(self.Doc._wrap_plan, original_plan)
+        self.assertNotIn('__init__', vars(JsonObject))
+        self.assertEqual(profiler.as_dict()['Late.name']['wrap']['count'], 1)
+        Late.wrap({'name': 'later'})
+        self.Doc.wrap({})
+        self.assertEqual(profiler.as_dict()['Late.name']['wrap']['count'], 1)
+
 
 class User(JsonObject):
     username = StringProperty()